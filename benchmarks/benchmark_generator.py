@@ -0,0 +1,181 @@
+"""Benchmark the Rosetta CSV generator end-to-end with synthetic data.
+
+Example:
+
+    python -m benchmarks.benchmark_generator --sizes 1000 10000 100000
+    python -m benchmarks.benchmark_generator --save-baseline baseline.json
+    python -m benchmarks.benchmark_generator --baseline baseline.json
+
+Each phase of `RosettaCSVGenerator.export_to_rosetta_csv` is timed via the
+generator's metrics and throughput (DROID rows per second) and peak memory
+are recorded. Results can be saved as a baseline and later runs compared
+against it.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+from benchmarks.synthetic_data import SyntheticOptions, write_synthetic_transfer
+
+DEFAULT_SIZES = [1000, 10000]
+
+
+def run_generator(paths, output_path):
+    """Run the generator over a synthetic transfer and return its
+    metrics.
+    """
+    csvgen = RosettaCSVGenerator(
+        droidcsv=paths["droid"],
+        exportsheet=paths["listcontrol"],
+        rosettaschema=paths["schema"],
+        configfile=paths["config"],
+        provenance=paths["provenance"],
+    )
+    with open(output_path, "w", encoding="utf-8", newline="") as output:
+        csvgen.export_to_rosetta_csv(output=output)
+    return csvgen.metrics, len(csvgen.droid.droidlist)
+
+
+def benchmark_size(rows, args, workdir):
+    """Benchmark a single transfer size."""
+    transfer = Path(workdir) / f"transfer-{rows}"
+    paths = write_synthetic_transfer(
+        transfer,
+        rows,
+        SyntheticOptions(
+            duplicate_rate=args.duplicate_rate,
+            depth=args.depth,
+            provenance_rate=args.provenance_rate,
+            seed=args.seed,
+        ),
+    )
+    if args.memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    metrics, droid_rows = run_generator(paths, transfer / "rosetta.csv")
+    total = time.perf_counter() - start
+    peak = None
+    if args.memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "rows": rows,
+        "droid_rows": droid_rows,
+        "phases": metrics.timings,
+        "counters": metrics.counters,
+        "total": total,
+        "throughput": droid_rows / total if total else 0,
+        "peak_memory_mb": peak / 1024 / 1024 if peak is not None else None,
+    }
+
+
+def print_result(result):
+    """Print the result of benchmarking a single transfer size."""
+    print(f"rows: {result['rows']}")
+    for phase, elapsed in result["phases"].items():
+        print(f"  {phase:<22} {elapsed:10.4f}s")
+    print(f"  {'total':<22} {result['total']:10.4f}s")
+    for counter, count in result["counters"].items():
+        print(f"  {counter:<22} {count:10d}")
+    print(f"  {'throughput':<22} {result['throughput']:10.0f} rows/s")
+    if result["peak_memory_mb"] is not None:
+        print(f"  {'peak memory':<22} {result['peak_memory_mb']:10.1f} MB")
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Compare results with a baseline and return the number of
+    regressions.
+    """
+    regressions = 0
+    for size, result in results.items():
+        if size not in baseline:
+            print(f"rows: {size} not in baseline")
+            continue
+        print(f"rows: {size} compared with baseline (current / baseline)")
+        measures = dict(result["phases"], total=result["total"])
+        expected = dict(baseline[size]["phases"], total=baseline[size]["total"])
+        for name, elapsed in measures.items():
+            if not expected.get(name):
+                continue
+            ratio = elapsed / expected[name]
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = " REGRESSION"
+                regressions += 1
+            print(f"  {name:<22} {ratio:10.2f}x{flag}")
+    return regressions
+
+
+def main():
+    """Primary entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--sizes",
+        help="Number of files in each synthetic transfer, e.g. 1000 10000 100000 1000000",
+        nargs="+",
+        type=int,
+        default=DEFAULT_SIZES,
+    )
+    parser.add_argument(
+        "--duplicate-rate",
+        help="Proportion of files that duplicate an earlier checksum.",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument(
+        "--depth", help="Depth of the sub-series folders.", type=int, default=2
+    )
+    parser.add_argument(
+        "--provenance-rate",
+        help="Proportion of records with a provenance note.",
+        type=float,
+        default=0.01,
+    )
+    parser.add_argument("--seed", help="Random seed.", type=int, default=1)
+    parser.add_argument(
+        "--no-memory",
+        help="Don't trace peak memory, tracing slows down the run.",
+        dest="memory",
+        action="store_false",
+    )
+    parser.add_argument("--baseline", help="Baseline JSON to compare results with.")
+    parser.add_argument("--save-baseline", help="Save results as a baseline JSON.")
+    parser.add_argument(
+        "--tolerance",
+        help="Slowdown allowed before a phase is reported as a regression.",
+        type=float,
+        default=0.2,
+    )
+    parser.add_argument("--workdir", help="Directory to write synthetic data to.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workdir = args.workdir or tmp_dir
+        for rows in args.sizes:
+            result = benchmark_size(rows, args, workdir)
+            results[str(rows)] = result
+            print_result(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare_with_baseline(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
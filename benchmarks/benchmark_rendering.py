@@ -0,0 +1,97 @@
+"""Benchmark rendering Rosetta CSV rows with csv.writer against the
+previous hand-quoted renderer.
+
+Example:
+
+    python -m benchmarks.benchmark_rendering --rows 100000
+
+The section rows for a synthetic transfer are created once and then
+rendered repeatedly by each renderer, throughput is reported in rows
+per second. The previous renderer is kept here for comparison only, it
+doesn't escape quotes inside values.
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+from benchmarks.synthetic_data import SyntheticOptions, write_synthetic_transfer
+
+
+def legacy_item_rows(sectionrows):
+    """Render section rows the way the generator did before csv.writer,
+    each cell wrapped in quotes and joined by hand.
+    """
+    return "".join(
+        f'{",".join(f"{chr(34)}{cell}{chr(34)}" for cell in sectionrow)}\n'
+        for sectionrow in sectionrows
+    )
+
+
+def time_renderer(render, items, repeat):
+    """Return the best time taken to render every item."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for itemrow in items:
+            render(itemrow)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """Primary entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--rows",
+        help="Number of files in the synthetic transfer.",
+        type=int,
+        default=10000,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Times to render the rows, the best is reported.",
+        type=int,
+        default=3,
+    )
+    parser.add_argument("--seed", help="Random seed.", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_synthetic_transfer(
+            Path(tmp_dir) / f"transfer-{args.rows}",
+            args.rows,
+            SyntheticOptions(seed=args.seed),
+        )
+        csvgen = RosettaCSVGenerator(
+            droidcsv=paths["droid"],
+            exportsheet=paths["listcontrol"],
+            rosettaschema=paths["schema"],
+            configfile=paths["config"],
+            provenance=paths["provenance"],
+        )
+        csvgen.read_sources()
+        plan, _ = csvgen.prepare_item_rows()
+        items = [
+            csvgen.render_item(plan, item, csvgen.join_item(item), 0)[0]
+            for item in csvgen.exportlist
+        ]
+
+    rows = sum(len(itemrow) for itemrow in items)
+    print(f"items: {len(items)}, rows: {rows}")
+    for name, render in (
+        ("legacy", legacy_item_rows),
+        ("csv.writer", csvgen.csv_item_rows),
+    ):
+        elapsed = time_renderer(render, items, args.repeat)
+        print(f"  {name:<12} {elapsed:10.4f}s {rows / elapsed:12.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
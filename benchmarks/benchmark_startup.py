@@ -0,0 +1,109 @@
+"""Benchmark the start-up time of the Rosetta CSV command line.
+
+Example:
+
+    python -m benchmarks.benchmark_startup --runs 20
+
+Imports of the entry point are measured with `python -X importtime`
+and the slowest are listed. Wall-clock time for `--help` and for an
+args file that can't be read is measured over several runs, these are
+the paths wrapper scripts call most often and they shouldn't wait on
+the generator being imported.
+"""
+
+import argparse
+import importlib.util
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules the entry point can be imported as, installed or from source.
+ENTRY_POINTS = [
+    "anz_rosetta_csv.anz_rosetta_csv",
+    "src.anz_rosetta_csv.anz_rosetta_csv",
+]
+
+
+def entry_point():
+    """Return the module name the entry point can be imported as."""
+    for module in ENTRY_POINTS:
+        try:
+            if importlib.util.find_spec(module) is not None:
+                return module
+        except ModuleNotFoundError:
+            continue
+    sys.exit("unable to find the anz_rosetta_csv entry point")
+
+
+def import_times(module):
+    """Return (cumulative microseconds, module) for every import made when
+    importing the entry point, slowest first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times.append((int(cumulative), name.strip()))
+    return sorted(times, reverse=True)
+
+
+def entry_point_command(module, args):
+    """Return the command to run the entry point with args."""
+    return [
+        sys.executable,
+        "-c",
+        f"import sys; from {module} import main; sys.argv[0] = 'anz_rosetta_csv'; main()",
+        *args,
+    ]
+
+
+def run_times(command, runs):
+    """Return the wall-clock time of each run of a command."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, check=False)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    """Primary entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--runs",
+        help="Runs of each command, the median is reported.",
+        type=int,
+        default=10,
+    )
+    parser.add_argument("--top", help="Slowest imports to list.", type=int, default=10)
+    args = parser.parse_args()
+
+    module = entry_point()
+    times = import_times(module)
+    print(f"imports of {module}: {len(times)}")
+    for cumulative, name in times[: args.top]:
+        print(f"  {name:<50} {cumulative / 1000:10.2f}ms")
+    generator_loaded = any(name.endswith("rosetta_csv_generator") for _, name in times)
+    print(f"  generator imported at start-up: {generator_loaded}")
+
+    baseline = run_times([sys.executable, "-c", "pass"], args.runs)
+    print(f"python start-up: {statistics.median(baseline):.4f}s")
+    for label, command in (
+        ("--help", ["--help"]),
+        ("unreadable args file", ["--args", "missing-args.cfg"]),
+    ):
+        elapsed = run_times(entry_point_command(module, command), args.runs)
+        print(f"{label}: {statistics.median(elapsed):.4f}s")
+
+
+if __name__ == "__main__":
+    main()
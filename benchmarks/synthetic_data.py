@@ -0,0 +1,256 @@
+"""Synthetic transfer data for benchmarking the Rosetta CSV generator.
+
+Writes a DROID export, list control, provenance notes, config and
+schema that resemble a real transfer. Files are spread over sub-series
+folders of a configurable depth and a proportion of files are copies of
+earlier files, e.g. template documents, so that their checksums and
+titles are duplicated across sub-series.
+"""
+
+import configparser as ConfigParser
+import csv
+import hashlib
+import itertools
+import random
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_CONFIG = REPO_ROOT / "rosetta-configs" / "rosetta-csv-mapping-events.cfg"
+DEFAULT_SCHEMA = (
+    REPO_ROOT / "rosetta-schemas" / "rosetta-csv-validation-schema-with-events-anz.json"
+)
+
+PATH_MASK = "Y:\\anz\\livetransfers\\BENCH\\workcopy\\"
+
+# files in each leaf folder of the transfer.
+FILES_PER_FOLDER = 50
+
+DROID_HEADER = [
+    "ID",
+    "PARENT_ID",
+    "URI",
+    "FILE_PATH",
+    "NAME",
+    "METHOD",
+    "STATUS",
+    "SIZE",
+    "TYPE",
+    "EXT",
+    "LAST_MODIFIED",
+    "EXTENSION_MISMATCH",
+    "SHA256_HASH",
+    "FORMAT_COUNT",
+    "PUID",
+    "MIME_TYPE",
+    "FORMAT_NAME",
+    "FORMAT_VERSION",
+]
+
+PROVENANCE_HEADER = ["RECORDNUMBER", "NOTEDATE", "NOTETEXT", "ORIGINALNAME", "CHECKSUM"]
+
+
+@dataclass(frozen=True)
+class SyntheticOptions:
+    """Shape of a synthetic transfer: the proportion of files that are
+    duplicates, have provenance notes or are containers, the depth of the
+    sub-series folders and the random seed.
+    """
+
+    duplicate_rate: float = 0.05
+    depth: int = 2
+    provenance_rate: float = 0.01
+    container_rate: float = 0.01
+    seed: int = 1
+
+
+def folder_parts(folder: int, depth: int) -> list:
+    """Return the sub-series folders for a leaf folder number.
+
+    Only the leaf folder is unique so that sub-series higher up the tree
+    are shared between folders.
+    """
+    parts = [f"Sub-Series {(folder // 10**level) % 7}" for level in range(depth - 1)]
+    parts.append(f"Folder {folder:06d}")
+    return parts
+
+
+def droid_uri(path: str) -> str:
+    """Return a DROID style file URI for a path."""
+    return f"file:/{path.replace(chr(92), '/')}"
+
+
+def write_config(source: Path, target: Path):
+    """Write a copy of a mapping config with path masks that match the
+    synthetic DROID export.
+    """
+    config = ConfigParser.RawConfigParser()
+    config.optionxform = str
+    config.read(source, encoding="utf-8")
+    if not config.has_section("path values"):
+        config.add_section("path values")
+    config.set("path values", "pathmask", PATH_MASK)
+    config.set("path values", "subseriesmask", PATH_MASK)
+    with open(target, "w", encoding="utf-8") as config_file:
+        config.write(config_file)
+    return config
+
+
+def list_control_header(config) -> list:
+    """Return the list control header needed by a mapping config."""
+    header = ["Item Code", "Missing Comment", "Sub-Series", "Title"]
+    for field, column in config.items("rosetta mapping"):
+        if field != "SIP Title" and column not in header:
+            header.append(column)
+    return header
+
+
+def record_number(idx: int) -> str:
+    """Return the record number of the list control item for a file."""
+    return f"R{idx:08d}"
+
+
+def synthetic_files(rows: int, options: SyntheticOptions, rng) -> list:
+    """Return the sub-series folders, title and checksum of each file in
+    the transfer.
+
+    A proportion of files are copies of earlier files in another folder
+    and share their title and checksum.
+    """
+    files = []
+    names_in_folder = set()
+    parts = None
+    for idx in range(rows):
+        folder = idx // FILES_PER_FOLDER
+        if idx % FILES_PER_FOLDER == 0:
+            parts = folder_parts(folder, options.depth)
+        title, checksum = f"Document {idx:07d}", ""
+        if files and rng.random() < options.duplicate_rate:
+            # copy an earlier file into this folder, e.g. a template...
+            _, source_title, source_checksum = rng.choice(files)
+            if (folder, source_title) not in names_in_folder:
+                title, checksum = source_title, source_checksum
+        if not checksum:
+            checksum = hashlib.sha256(title.encode("utf-8")).hexdigest()
+        files.append((parts, title, checksum))
+        names_in_folder.add((folder, title))
+    return files
+
+
+def write_droid_folders(droid, ids, parts: list, folder_ids: dict) -> int:
+    """Write a DROID row for each folder the first time it is seen and
+    return the DROID ID of the leaf folder.
+    """
+    parent_id = 0
+    for level, part in enumerate(parts):
+        folder_path = "\\".join(parts[: level + 1])
+        if folder_path not in folder_ids:
+            folder_ids[folder_path] = next(ids)
+            full_path = f"{PATH_MASK}{folder_path}"
+            droid.writerow(
+                [folder_ids[folder_path], parent_id, f"{droid_uri(full_path)}/"]
+                + [full_path, part, "", "Done", "", "Folder", ""]
+                + ["2017-06-27T13:49:34", "false", "", "", "", "", "", ""]
+            )
+        parent_id = folder_ids[folder_path]
+    return parent_id
+
+
+def write_droid_export(path: Path, files: list, options: SyntheticOptions, rng):
+    """Write the DROID export of the files in the transfer."""
+    ids = itertools.count(1)
+    folder_ids = {}
+    with open(path, "w", encoding="utf-8", newline="") as droid_file:
+        droid = csv.writer(droid_file, quoting=csv.QUOTE_MINIMAL)
+        droid.writerow(DROID_HEADER)
+        for parts, title, checksum in files:
+            parent_id = write_droid_folders(droid, ids, parts, folder_ids)
+            name = f"{title}.docx"
+            file_path = PATH_MASK + "\\".join(parts + [name])
+            droid_id = next(ids)
+            droid.writerow(
+                [droid_id, parent_id, droid_uri(file_path), file_path, name]
+                + ["Signature", "Done", rng.randint(1024, 10485760), "File", "docx"]
+                + ["2006-02-13T10:45:40", "false", checksum, 1, "fmt/412"]
+                + ["application/vnd.openxmlformats", "Microsoft Word", "2007 onwards"]
+            )
+            if rng.random() < options.container_rate:
+                # container contents are in the export but not the transfer...
+                droid.writerow(
+                    [next(ids), droid_id, f"zip:{droid_uri(file_path)}!/word"]
+                    + [f"{file_path}!/word", "word", "", "Done", 0, "File", "", ""]
+                    + ["false", "", "", "", "", "", ""]
+                )
+
+
+def write_list_control(path: Path, files: list, mapping, rng):
+    """Write the list control for the files in the transfer, with the
+    columns needed by the mapping config.
+    """
+    header = list_control_header(mapping)
+    access_values = [key for key, _ in mapping.items("access values")] or [""]
+    access_columns = [
+        column
+        for field, column in mapping.items("rosetta mapping")
+        if field == "Access Rights Policy ID (IE)"
+    ]
+    with open(path, "w", encoding="utf-8", newline="") as lc_file:
+        listcontrol = csv.writer(lc_file, quoting=csv.QUOTE_MINIMAL)
+        listcontrol.writerow(header)
+        for idx, (parts, title, checksum) in enumerate(files):
+            values = {column: rng.choice(access_values) for column in access_columns}
+            values.update(
+                {
+                    "Item Code": record_number(idx),
+                    "Missing Comment": checksum,
+                    "Sub-Series": "\\".join(parts),
+                    "Title": title,
+                }
+            )
+            listcontrol.writerow([values.get(column, "AAAA") for column in header])
+
+
+def write_provenance_notes(path: Path, rows: int, options: SyntheticOptions, rng):
+    """Write provenance notes for a proportion of the list control items."""
+    with open(path, "w", encoding="utf-8", newline="") as prov_file:
+        provenance = csv.writer(prov_file, quoting=csv.QUOTE_MINIMAL)
+        provenance.writerow(PROVENANCE_HEADER)
+        for idx in range(rows):
+            if rng.random() < options.provenance_rate:
+                provenance.writerow(
+                    [record_number(idx), "2017-10-27 12:51:00", "File migrated"]
+                    + ["Ignore", "Ignore"]
+                )
+
+
+def write_synthetic_transfer(
+    directory,
+    rows,
+    options=SyntheticOptions(),
+    config=DEFAULT_CONFIG,
+    schema=DEFAULT_SCHEMA,
+):
+    """Write a synthetic transfer of `rows` files to `directory`.
+
+    Returns a dictionary of the paths written: droid, listcontrol,
+    provenance, config and schema.
+    """
+    rng = random.Random(options.seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "droid": directory / "droid.csv",
+        "listcontrol": directory / "listcontrol.csv",
+        "provenance": directory / "prov.notes",
+        "config": directory / "config.cfg",
+        "schema": directory / "schema.json",
+    }
+    mapping = write_config(Path(config), paths["config"])
+    shutil.copyfile(schema, paths["schema"])
+    files = synthetic_files(rows, options, rng)
+    write_droid_export(paths["droid"], files, options, rng)
+    write_list_control(paths["listcontrol"], files, mapping, rng)
+    write_provenance_notes(paths["provenance"], rows, options, rng)
+    return paths
@@ -2,23 +2,39 @@
 
 # pylint: disable=C0103; # upper-case naming conventions for constants.
 # pylint: disable=W0603; # global used for logger.
+# pylint: disable=C0415; # imports outside toplevel for a fast start.
 
 import argparse
-import configparser as ConfigParser
 import logging
 import sys
 import time
 
-try:
-    from rosetta_csv_generator import RosettaCSVGenerator
-except ModuleNotFoundError:
-    try:
-        from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
-    except ModuleNotFoundError:
-        from anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+# The generator and schema modules are imported where they're used so that
+# --help and errors in arguments don't wait on them.
 
 logger = None
 
+# Options of an args file (--args) set as (option, argument, getter), the
+# getter being the config method that reads the option.
+ARGS_FILE_OPTIONS = (
+    ("output", "out", "get"),
+    ("duplicatesreport", "dupes", "get"),
+    ("metricsjson", "metrics_json", "get"),
+    ("cachedir", "cache", "get"),
+    ("checkpointdir", "checkpoint", "get"),
+    ("sharddir", "shard_dir", "get"),
+    ("maxfiles", "max_files", "getint"),
+    ("maxies", "max_ies", "getint"),
+    ("maxbytes", "max_bytes", "getint"),
+    ("pipeline", "pipeline", "getboolean"),
+    ("dryrun", "dry_run", "getboolean"),
+    ("verify", "verify", "getboolean"),
+    ("requirefixity", "require_fixity", "getboolean"),
+    ("verifyroot", "verify_root", "get"),
+    ("verifyworkers", "verify_workers", "getint"),
+    ("verifyreport", "verify_report", "get"),
+)
+
 
 def init_logging(debug: bool):
     """Initialize logging."""
@@ -36,14 +52,187 @@ def init_logging(debug: bool):
     logger.debug("debug logging is configured")
 
 
-def main():
-    """Primary entry point for this script."""
+def validate_csv(schemafile, csvfile):
+    """Validate an existing Rosetta CSV against the constraints in its
+    schema and return the number of errors found.
+    """
+    from .json_table_schema import json_table_schema
+
+    with open(schemafile, "r", encoding="utf-8") as rosetta_schema:
+        schema = json_table_schema.JSONTableSchema(rosetta_schema.read())
+    validator = schema.compile_validators()
+    errors = 0
+    for line, column, value, message in validator.validate_csv(csvfile):
+        errors += 1
+        print(f"line {line}, column '{column}' is invalid, {message}: '{value}'")
+    logger.info("validation errors found in '%s': %s", csvfile, errors)
+    return errors
+
+
+def write_report(report, reportfile=None):
+    """Write a JSON report to a file, or stdout."""
+    if not reportfile:
+        report.write_json(sys.stdout)
+        return
+    with open(reportfile, "w", encoding="utf-8") as report_file:
+        report.write_json(report_file)
+
+
+def read_args_file(args):
+    """Read arguments from an args file (--args) into the parsed
+    arguments.
+    """
+    from .rosetta_config_class import RosettaConfig
+
+    config = RosettaConfig.load(args.args, ("arguments",))
+    if config.has_option("arguments", "title"):
+        logger.info("using the '%s' args file", config.get("arguments", "title"))
+    logging.info("reading args from: '%s'", args.args)
+    if config.has_option("arguments", "droidexport"):
+        # one DROID CSV, or glob pattern, per line.
+        args.csv = [
+            droidexport.strip()
+            for droidexport in config.get("arguments", "droidexport").splitlines()
+            if droidexport.strip()
+        ]
+        args.ros = config.get("arguments", "schemafile")
+        args.cfg = config.get("arguments", "configfile")
+        args.exp = config.get("arguments", "listcontrol")
+        args.pro = config.get("arguments", "provenance")
+    for option, argument, getter in ARGS_FILE_OPTIONS:
+        if config.has_option("arguments", option):
+            setattr(args, argument, getattr(config, getter)("arguments", option))
+
+
+def serve(args):
+    """Run the job server until it is interrupted."""
+    from .rosetta_csv_server_class import JOB_WORKERS, RosettaCSVServer
+
+    server = RosettaCSVServer(args.serve, workers=args.workers or JOB_WORKERS)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("stopping the job server")
+    finally:
+        server.shutdown()
+    sys.exit()
+
+
+def sip_sharder(args):
+    """Return the SIP sharder for --shard-dir, or None if the Rosetta CSV
+    isn't to be sharded.
+    """
+    if not args.shard_dir:
+        return None
+    if not (args.max_files or args.max_ies or args.max_bytes):
+        logger.error("SIP shards need --max-files, --max-ies or --max-bytes")
+        sys.exit(1)
+    if args.checkpoint:
+        logger.error("SIP shards can't be written with a checkpoint")
+        sys.exit(1)
+    from .sip_sharder_class import SIPSharder
+
+    return SIPSharder(args.max_files, args.max_ies, args.max_bytes)
+
+
+def write_metrics(csvgen, metricsfile=None):
+    """Write the generator's metrics to a JSON file, if one is given."""
+    if metricsfile:
+        csvgen.metrics.write_json(metricsfile)
+
+
+def verify(args):
+    """Only verify the fixity of the files in the DROID exports."""
+    if not (args.csv and args.cfg):
+        logger.error("fixity verification needs --csv and --cfg")
+        sys.exit(1)
+    from .fixity_verifier_class import verify_fixity
+    from .rosetta_csv_generator import RosettaCSVGenerator
+
+    csvgen = RosettaCSVGenerator(
+        droidcsv=args.csv,
+        exportsheet=args.exp,
+        configfile=args.cfg,
+        cachedir=args.cache,
+    )
+    report = verify_fixity(csvgen, args.verify_root, args.verify_workers)
+    write_report(report, args.verify_report)
+    write_metrics(csvgen, args.metrics_json)
+    sys.exit(0 if report.ok else 1)
+
+
+def require_fixity(args, csvgen):
+    """Verify fixity before creating the Rosetta CSV and exit if any file
+    fails.
+    """
+    from .fixity_verifier_class import verify_fixity
+
+    report = verify_fixity(csvgen, args.verify_root, args.verify_workers)
+    if args.verify_report:
+        write_report(report, args.verify_report)
+    if not report.ok:
+        logger.error("fixity verification failed, not creating the Rosetta CSV")
+        sys.exit(1)
+
+
+def dry_run(args, csvgen):
+    """Only join the list control to the DROID exports and report the
+    items that don't match.
+    """
+    from .preflight_report_class import preflight
+
+    report = preflight(csvgen)
+    write_report(report, args.out)
+    write_metrics(csvgen, args.metrics_json)
+    sys.exit(0 if report.ok else 1)
+
+
+def generate(args):
+    """Create the Rosetta CSV, or its SIP shards."""
+    from .rosetta_csv_generator import RosettaCSVGenerator
+
+    sharder = sip_sharder(args)
+    csvgen = RosettaCSVGenerator(
+        droidcsv=args.csv,
+        exportsheet=args.exp,
+        rosettaschema=args.ros,
+        configfile=args.cfg,
+        provenance=args.pro,
+        duplicatesreport=args.dupes,
+        cachedir=args.cache,
+        validate=args.validate,
+        checkpointdir=args.checkpoint,
+        sharder=sharder,
+        pipeline=args.pipeline,
+    )
+    if args.require_fixity:
+        require_fixity(args, csvgen)
+    if args.dry_run:
+        dry_run(args, csvgen)
+    if sharder is not None:
+        from .sip_sharder_class import SIPShardWriter
+
+        SIPShardWriter(csvgen).write(args.shard_dir)
+    elif not args.out:
+        csvgen.export_to_rosetta_csv(output=sys.stdout)
+    else:
+        csvgen.export_to_rosetta_csv_file(args.out)
+    write_metrics(csvgen, args.metrics_json)
+    sys.exit()
+
+
+def arg_parser():
+    """Return the parser for the command line arguments."""
 
     parser = argparse.ArgumentParser(
         description="Generate a Rosetta Ingest CSV from Collections List Control and DROID CSV Reports."
     )
     parser.add_argument(
-        "--csv", help="Single DROID CSV to read.", default=False, required=False
+        "--csv",
+        help="DROID CSVs, or glob patterns for them, to read and merge.",
+        nargs="+",
+        default=False,
+        required=False,
     )
     parser.add_argument(
         "--exp",
@@ -64,6 +253,118 @@ def main():
         default=False,
         required=False,
     )
+    parser.add_argument(
+        "--out",
+        "--output",
+        help="File to write the Rosetta CSV to, defaults to stdout.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--dupes",
+        "--duplicates-report",
+        help="File to write a JSON report of duplicate checksums in the DROID CSV to.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="File to write timings for each phase and counters for the run to.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--cache",
+        help="Directory to cache the DROID index in between runs.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Directory to record progress in so an interrupted run can be resumed, needs --out.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--shard-dir",
+        help="Directory to write the Rosetta CSV to as several SIPs, limited by --max-files, --max-ies or --max-bytes.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--max-files", help="Maximum files in each SIP.", type=int, default=None
+    )
+    parser.add_argument(
+        "--max-ies", help="Maximum IEs in each SIP.", type=int, default=None
+    )
+    parser.add_argument(
+        "--max-bytes",
+        help="Maximum total bytes of the files in each SIP, from the DROID SIZE column.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--pipeline",
+        help="Read inputs concurrently and write output while rows are created.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dry-run",
+        "--preflight",
+        help="Only join the list control to the DROID CSVs and report items that don't match, as JSON to --out or stdout.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--verify",
+        help="Only verify the fixity of the files in the DROID CSVs against their DROID checksums, needs --csv and --cfg.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--require-fixity",
+        help="Verify fixity before creating the Rosetta CSV and don't create it if any file fails.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--verify-root",
+        help="Directory to find files to verify under, by their DROID path with the config's pathmask removed.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--verify-workers",
+        help="Processes hashing files at the same time, defaults to the number of CPUs.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--verify-report",
+        help="File to write the JSON fixity report to, --verify writes it to stdout otherwise.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--validate",
+        help="Validate rows against the Rosetta CSV schema as they are created.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--validate-csv",
+        help="Validate an existing Rosetta CSV against the Rosetta CSV schema (--ros) and exit.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--serve",
+        help="Run as a local job server on HOST:PORT, or unix:PATH for a Unix socket.",
+        default=False,
+        required=False,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Jobs the server runs at the same time.",
+        type=int,
+        default=None,
+    )
     parser.add_argument(
         "--args",
         "--arg",
@@ -76,7 +377,13 @@ def main():
         help="Use DEBUG mode for more logging",
         action="store_true",
     )
+    return parser
+
+
+def main():
+    """Primary entry point for this script."""
 
+    parser = arg_parser()
     if len(sys.argv) == 1:
         parser.print_help()
         sys.exit()
@@ -87,29 +394,25 @@ def main():
     init_logging(args.debug)
 
     if args.args:
-        config = ConfigParser.RawConfigParser()
-        config.read(args.args)
-        if config.has_option("arguments", "title"):
-            logger.info("using the '%s' args file", config.get("arguments", "title"))
-        logging.info("reading args from: '%s'", args.args)
-        if config.has_option("arguments", "droidexport"):
-            args.csv = config.get("arguments", "droidexport")
-            args.ros = config.get("arguments", "schemafile")
-            args.cfg = config.get("arguments", "configfile")
-            args.exp = config.get("arguments", "listcontrol")
-            args.pro = config.get("arguments", "provenance")
+        read_args_file(args)
+
+    if args.serve:
+        serve(args)
+
+    if args.validate_csv:
+        if not args.ros:
+            parser.error("--validate-csv needs the Rosetta CSV schema (--ros)")
+        sys.exit(1 if validate_csv(args.ros, args.validate_csv) else 0)
+
+    if args.checkpoint and not args.out:
+        logger.error("a checkpoint needs an output file (--out) to resume")
+        sys.exit(1)
+
+    if args.verify:
+        verify(args)
 
     if args.csv and args.exp and args.ros and args.cfg:
-        csvgen = RosettaCSVGenerator(
-            droidcsv=args.csv,
-            exportsheet=args.exp,
-            rosettaschema=args.ros,
-            configfile=args.cfg,
-            provenance=args.pro,
-        )
-        res = csvgen.export_to_rosetta_csv()
-        print(res)
-        sys.exit()
+        generate(args)
 
     parser.print_help()
     sys.exit()
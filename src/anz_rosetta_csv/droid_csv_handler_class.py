@@ -3,9 +3,19 @@
 # pylint: disable=R0903
 
 import csv
+import glob
 import os.path
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
+from .droid_row_class import DroidRow
+
+# DROID exports read at the same time.
+DROID_READ_WORKERS = 4
+
+# URIs of files on disk, rather than inside containers, e.g. `zip:file:`.
+FILE_URI_PREFIX = "file:"
+
 
 class GenericCSVHandler:
     """Generic CSV handling class."""
@@ -16,29 +26,39 @@ class GenericCSVHandler:
             header_list.append(header)
         return header_list
 
-    def csv_as_list(self, csvfname):
+    def read_header(self, csvfname):
+        """Return the header of a CSV without reading its rows."""
+        with open(csvfname, "r", encoding="utf-8") as csv_file:
+            csv_reader = csv.reader(csv_file, delimiter=",", quotechar='"')
+            return self.__get_csv_headers(next(csv_reader, []))
+
+    def iter_rows(self, csvfname, columns=None):
+        """Iterate over the rows of a CSV.
+
+        yields each row as a dictionary: header: value, pair. If a
+        collection of `columns` is given only those columns are included
+        in the row, columns not in the CSV are ignored.
+        """
+        with open(csvfname, "r", encoding="utf-8") as csv_file:
+            csv_reader = csv.reader(csv_file, delimiter=",", quotechar='"')
+            header_list = self.__get_csv_headers(next(csv_reader, []))
+            # note: don't need ID data. Ignoring multiple ID.
+            projection = [
+                (idx, header)
+                for idx, header in enumerate(header_list)
+                if columns is None or header in columns
+            ]
+            for row in csv_reader:
+                yield {header: row[idx] for idx, header in projection}
+
+    def csv_as_list(self, csvfname, columns=None):
         """Enable the return of a CSV as a list.
 
         returns list of rows, each row is a dictionary: header: value, pair
         """
-        columncount = 0
-        csvlist = None
-        if os.path.isfile(csvfname):
-            csvlist = []
-            with open(csvfname, "r", encoding="utf-8") as csv_file:
-                csv_reader = csv.reader(csv_file, delimiter=",", quotechar='"')
-                for row in csv_reader:
-                    if csv_reader.line_num == 1:  # not zero-based index
-                        header_list = self.__get_csv_headers(row)
-                        columncount = len(header_list)
-                    else:
-                        csv_dict = {}
-                        # for each column in header
-                        # note: don't need ID data. Ignoring multiple ID.
-                        for i in range(columncount):
-                            csv_dict[header_list[i]] = row[i]
-                        csvlist.append(csv_dict)
-        return csvlist
+        if not os.path.isfile(csvfname):
+            return None
+        return list(self.iter_rows(csvfname, columns))
 
 
 class DroidCSVHandler:
@@ -48,22 +68,96 @@ class DroidCSVHandler:
         """Function Init."""
         self.csv = None
 
-    def read_droid_csv(self, droidcsvfname):
+    def read_droid_csv(self, droidcsvfname, columns=None):
         """Read a DROID CSV into self."""
         csvhandler = GenericCSVHandler()
-        self.csv = csvhandler.csv_as_list(droidcsvfname)
+        self.csv = csvhandler.csv_as_list(droidcsvfname, columns)
         return self.csv
 
+    def read_droid_header(self, droidcsvfname):
+        """Return the columns of a DROID CSV, e.g. to choose its hash
+        column before its rows are read.
+        """
+        csvhandler = GenericCSVHandler()
+        return csvhandler.read_header(droidcsvfname)
+
+    def iter_droid_csv(self, droidcsvfname, columns=None):
+        """Iterate over the rows of a DROID CSV without reading it into
+        memory.
+        """
+        csvhandler = GenericCSVHandler()
+        return csvhandler.iter_rows(droidcsvfname, columns)
+
+    def expand_droid_paths(self, droidcsvs):
+        """Expand DROID CSV file names and glob patterns into a list of
+        files.
+
+        Files are returned in the order given, glob matches are sorted,
+        and a file matched more than once is only returned once. Returns
+        the files and the patterns that didn't match a file.
+        """
+        if isinstance(droidcsvs, (str, os.PathLike)):
+            droidcsvs = [droidcsvs]
+        files = []
+        seen = set()
+        unmatched = []
+        for pattern in droidcsvs:
+            pattern = str(pattern)
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(pattern))
+            else:
+                matches = [pattern] if os.path.isfile(pattern) else []
+            if not matches:
+                unmatched.append(pattern)
+            for match in matches:
+                if os.path.abspath(match) not in seen:
+                    seen.add(os.path.abspath(match))
+                    files.append(match)
+        return files, unmatched
+
+    def read_filtered_droid_csv(self, droidcsvfname, columns=None, keep=None):
+        """Read a DROID CSV removing folders and container contents as
+        it is read.
+
+        If a collection of `keep` columns is given, rows are returned as
+        compact DroidRows with only those columns, e.g. without the
+        columns only needed for filtering.
+        """
+        droidlist = []
+        kept = index = None
+        is_file_uri = self.is_file_uri
+        for row in self.iter_droid_csv(droidcsvfname, columns):
+            if row["TYPE"] == "Folder" or not is_file_uri(row["URI"]):
+                continue
+            if keep is None:
+                droidlist.append(row)
+                continue
+            if kept is None:
+                kept = [column for column in row if column in keep]
+                index = DroidRow.column_index(kept)
+            droidlist.append(DroidRow(index, tuple(row[column] for column in kept)))
+        return droidlist
+
+    def read_droid_csvs(self, droidcsvfnames, columns=None, keep=None, workers=None):
+        """Read many DROID CSVs concurrently, removing folders and
+        container contents from each as it is read.
+
+        returns a list of filtered rows for each file, in the order given.
+        """
+        workers = workers or min(len(droidcsvfnames), DROID_READ_WORKERS) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    lambda fname: self.read_filtered_droid_csv(fname, columns, keep),
+                    droidcsvfnames,
+                )
+            )
+
     def remove_container_contents(self, droidlist):
         """Remove container contents if they serve no purpose in an
         analysis or other output.
         """
-        newlist = []  # naive remove causes loop to skip items
-        for row in droidlist:
-            self.get_uri_scheme(row["URI"])
-            if self.get_uri_scheme(row["URI"]) == "file":
-                newlist.append(row)
-        return newlist
+        return [row for row in droidlist if self.is_file_uri(row["URI"])]
 
     def remove_folders(self, droidlist):
         """Remove folders if they serve no purpose in an analysis or
@@ -94,3 +188,12 @@ class DroidCSVHandler:
     def get_uri_scheme(self, url):
         """Get the URL scheme for a URI in a DROID report."""
         return urlparse(url).scheme
+
+    @staticmethod
+    def is_file_uri(uri):
+        """Return True if a URI in a DROID report is a file on disk.
+
+        A prefix check, rather than parsing the URI, as it is made for
+        every row. URI schemes are case-insensitive.
+        """
+        return uri.startswith(FILE_URI_PREFIX) or uri[:5].lower() == FILE_URI_PREFIX
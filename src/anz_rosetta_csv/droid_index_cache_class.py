@@ -0,0 +1,192 @@
+"""DROID index cache.
+
+Stores the filtered rows of one or more DROID exports, their merged
+checksum index and duplicate checksums on disk so that repeat runs
+against the same exports don't need to parse them again. An entry is
+checked against the size and modification time of each export, and only
+against its content hash if the modification time has changed.
+
+Rows are stored a column at a time, as a few long JSON arrays decode much
+faster than millions of short ones, and the checksum index is rebuilt
+from the hash column rather than stored.
+"""
+
+import gc
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from .droid_index_class import DroidIndex
+from .droid_row_class import DroidRow
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def gc_paused():
+    """Pause cyclic garbage collection while millions of objects that
+    can't form reference cycles are created, as it would otherwise run
+    over and over for no gain.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class DroidIndexCache:
+    """DROID index cache class."""
+
+    # increment when the structure of a cache entry, or how DROID
+    # exports are filtered, changes.
+    cache_version = 3
+
+    def __init__(self, cachedir):
+        self.cachedir = Path(cachedir)
+
+    def fingerprint(self, droidcsv):
+        """Return the fingerprint of a DROID export: its size,
+        modification time and content hash.
+        """
+        stat = os.stat(droidcsv)
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": self.content_hash(droidcsv),
+        }
+
+    def content_hash(self, droidcsv):
+        """Return the SHA-256 of the content of a DROID export."""
+        sha256 = hashlib.sha256()
+        with open(droidcsv, "rb") as droid_file:
+            for chunk in iter(lambda: droid_file.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def unchanged(self, droidcsv, fingerprint):
+        """Return True if a DROID export matches its fingerprint.
+
+        An export with the same size and modification time is trusted to
+        be unchanged without reading it. Its content is only hashed when
+        the modification time differs, e.g. the export was copied or
+        touched, so that a cache entry survives that.
+        """
+        stat = os.stat(droidcsv)
+        if fingerprint.get("size") != stat.st_size:
+            return False
+        if fingerprint.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+        return fingerprint.get("sha256") == self.content_hash(droidcsv)
+
+    def cache_file(self, droidcsvs):
+        """Return the cache file for a list of DROID exports."""
+        paths = "\n".join(str(Path(droidcsv).resolve()) for droidcsv in droidcsvs)
+        key = hashlib.sha256(paths.encode("utf-8"))
+        return self.cachedir / f"{key.hexdigest()}.json"
+
+    def read_entry(self, cache_file):
+        """Return a cache entry, or None if it can't be read."""
+        if not cache_file.is_file():
+            return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as cache:
+                return json.load(cache)
+        except (OSError, ValueError) as err:
+            logger.warning("ignoring unreadable DROID cache '%s': %s", cache_file, err)
+            return None
+
+    def valid(self, entry, droidcsvs, columns):
+        """Return True if a cache entry is for the current version, the
+        same columns and unchanged DROID exports.
+        """
+        fingerprints = entry.get("fingerprints", [])
+        if (
+            entry.get("version") != self.cache_version
+            or entry.get("columns") != sorted(columns)
+            or len(fingerprints) != len(droidcsvs)
+        ):
+            return False
+        return all(
+            self.unchanged(droidcsv, fingerprint)
+            for droidcsv, fingerprint in zip(droidcsvs, fingerprints)
+        )
+
+    @staticmethod
+    def droid_rows(header, rows):
+        """Return the DroidRows of a cache entry's rows, as tuples of
+        values in header order.
+        """
+        index = DroidRow.column_index(header)
+        droidlist = []
+        for row in rows:
+            if None in row:
+                # None marks a column that isn't in the export a row came
+                # from.
+                columns = [
+                    column for column, value in zip(header, row) if value is not None
+                ]
+                droidlist.append(
+                    DroidRow(
+                        DroidRow.column_index(columns),
+                        tuple(value for value in row if value is not None),
+                    )
+                )
+                continue
+            droidlist.append(DroidRow(index, row))
+        return droidlist
+
+    def load(self, droidcsvs, columns):
+        """Load the cached index of a list of DROID exports.
+
+        Returns a DroidIndex, or None if there isn't a valid cache entry.
+        The rows are decoded from JSON on every hit. For 2 million rows
+        that took about 6 seconds, against about 25 seconds to read and
+        filter the exports again.
+        """
+        cache_file = self.cache_file(droidcsvs)
+        with gc_paused():
+            entry = self.read_entry(cache_file)
+            if entry is None or not self.valid(entry, droidcsvs, columns):
+                return None
+            header = entry["header"]
+            droidlist = self.droid_rows(header, zip(*entry["values"]))
+            checksums = entry["values"][header.index(entry["hashcolumn"])]
+            droidindex = {}
+            for checksum, row in zip(checksums, droidlist):
+                droidindex.setdefault(checksum, []).append(row)
+        droid = DroidIndex(droidcsvs, entry["hashcolumn"], droidlist, droidindex)
+        droid.duplicates = set(entry["duplicates"])
+        logger.info("using cached DROID index: '%s'", cache_file)
+        return droid
+
+    def save(self, droid, columns):
+        """Save the merged index of a list of DROID exports to the cache."""
+        header = list(
+            dict.fromkeys(column for row in droid.droidlist for column in row)
+        )
+        entry = {
+            "version": self.cache_version,
+            "fingerprints": [
+                self.fingerprint(droidcsv) for droidcsv in droid.droidcsvs
+            ],
+            "columns": sorted(columns),
+            "header": header,
+            "hashcolumn": droid.hashcolumn,
+            "values": [
+                [row.get(column) for row in droid.droidlist] for column in header
+            ],
+            "duplicates": sorted(droid.duplicates),
+        }
+        self.cachedir.mkdir(parents=True, exist_ok=True)
+        cache_file = self.cache_file(droid.droidcsvs)
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as cache:
+            json.dump(entry, cache, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_file, cache_file)
+        logger.info("saved DROID index to cache: '%s'", cache_file)
@@ -0,0 +1,191 @@
+"""DROID index.
+
+The filtered rows of one or more DROID exports are merged and indexed by
+checksum, and by checksum and normalized title, so that a list control
+item is joined to its DROID row in a lookup rather than a scan of every
+row. Once built, an index isn't changed by a run and can be shared
+between runs.
+"""
+
+import json
+import logging
+import re
+import sys
+
+from .droid_csv_handler_class import DroidCSVHandler
+from .import_sheet_generator import ImportSheetGenerator
+
+logger = logging.getLogger(__name__)
+
+# DROID hash columns in order of preference, unless configured with
+# `droidhashes` in `[application configuration]`.
+HASH_COLUMNS = ("MD5_HASH", "SHA1_HASH", "SHA256_HASH", "SHA512_HASH")
+
+# Runs of more than one space, normalized to a single space in titles.
+MULTIPLE_SPACES = re.compile(" {2,}")
+
+
+def normalize_spaces(filename: str) -> str:
+    """Normalize spaces in a filename."""
+    return MULTIPLE_SPACES.sub(" ", filename)
+
+
+def droid_title(filename: str) -> str:
+    """Return the normalized title of a DROID filename."""
+    return normalize_spaces(ImportSheetGenerator().get_title(filename))
+
+
+def droid_hash_column(droid_columns, priority=HASH_COLUMNS) -> str:
+    """Return the first hash column, in order of priority, available in
+    the columns, or a row, of a DROID export.
+    """
+    for hash_column in priority:
+        if hash_column in droid_columns:
+            return hash_column
+    logger.error("no hash available to use in DROID export.")
+    sys.exit(1)
+
+
+def subseries_path(droid_row: dict, series_mask: str) -> str:
+    """Return the sub-series path of a DROID row, i.e. its path with the
+    sub-series mask and file name removed.
+
+    Example:
+
+        sub-series mask: "R:\\Digitised\\Wellington\\mock_transfer\\2006-2007 "
+
+        droid path: "R:\\Digitised\\Wellington\\mock_transfer\\2006-2007 Project Programme\\2006-07 Project Programme Submission to MoU\\2006-07 Rules Bid_ (🥬) Letter.doc"
+
+        sub-series path: "Project Programme\\2006-07 Project Programme Submission to MoU"
+
+    which is compared to the sub-series of the list control item.
+    """
+    file_name = droid_row["NAME"].strip()
+    file_path = droid_row["FILE_PATH"].strip()
+    return file_path.replace(file_name, "").replace(series_mask, "", 1).strip()[:-1]
+
+
+def expand_droid_csvs(droidcsv):
+    """Return the DROID CSVs to read, expanding any glob patterns."""
+    droidcsvhandler = DroidCSVHandler()
+    droidcsvs, unmatched = droidcsvhandler.expand_droid_paths(droidcsv)
+    for pattern in unmatched:
+        logger.error("no DROID CSV found for: '%s'", pattern)
+    if unmatched or not droidcsvs:
+        sys.exit(1)
+    logger.info("reading %s DROID CSVs: %s", len(droidcsvs), droidcsvs)
+    return droidcsvs
+
+
+def select_hash_column(droidcsvs, priority=HASH_COLUMNS):
+    """Select the hash column to use from the headers of the DROID CSVs,
+    before their rows are read. Every export must use the same hash.
+    """
+    droidcsvhandler = DroidCSVHandler()
+    hashcolumn = None
+    for droidcsv in droidcsvs:
+        header = droidcsvhandler.read_droid_header(droidcsv)
+        if not header:
+            # an empty export has no rows to index.
+            continue
+        if hashcolumn is None:
+            hashcolumn = droid_hash_column(header, priority)
+        elif hashcolumn not in header:
+            logger.error(
+                "DROID CSV '%s' doesn't use the same hash as earlier exports: %s",
+                droidcsv,
+                hashcolumn,
+            )
+            sys.exit(1)
+    logger.info("using DROID hash column: %s", hashcolumn)
+    return hashcolumn
+
+
+class DroidIndex:
+    """DROID index class."""
+
+    def __init__(self, droidcsvs, hashcolumn, droidlist, droidindex):
+        self.droidcsvs = droidcsvs
+        self.hashcolumn = hashcolumn
+        self.droidlist = droidlist
+        self.droidindex = droidindex
+        self.duplicates = None
+        self.titleindex = None
+
+    @classmethod
+    def merge(cls, droidcsvs, hashcolumn, droidlists):
+        """Merge the filtered rows of each DROID CSV and index them by
+        checksum in the same pass.
+
+        A file profiled by more than one DROID run is only kept from the
+        first export it appears in.
+        """
+        merge = len(droidlists) > 1
+        # a single export has nothing to merge, its rows are used as read.
+        droidlist = [] if merge else next(iter(droidlists), [])
+        droidindex = {}
+        seen = set()
+        for droidcsv, rows in zip(droidcsvs, droidlists):
+            skipped = 0
+            for row in rows:
+                if merge:
+                    if row["FILE_PATH"] in seen:
+                        skipped += 1
+                        continue
+                    seen.add(row["FILE_PATH"])
+                    droidlist.append(row)
+                droidindex.setdefault(row[hashcolumn], []).append(row)
+            if skipped:
+                logger.warning(
+                    "ignoring %s files in '%s' already read from an earlier DROID CSV",
+                    skipped,
+                    droidcsv,
+                )
+        return cls(droidcsvs, hashcolumn, droidlist, droidindex)
+
+    def listduplicates(self):
+        """List duplicates discovered running this script."""
+        return {
+            checksum
+            for checksum, droid_rows in self.droidindex.items()
+            if len(droid_rows) > 1
+        }
+
+    def index_duplicates(self):
+        """Find the checksums shared by more than one DROID row."""
+        self.duplicates = self.listduplicates()
+
+    def index_titles(self):
+        """Index DROID rows by checksum and normalized title so titles are
+        normalized once per DROID row rather than once per comparison.
+        """
+        titles = {}
+        titleindex = {}
+        for drow in self.droidlist:
+            name = drow["NAME"]
+            title = titles.get(name)
+            if title is None:
+                title = titles[name] = droid_title(name)
+            titleindex.setdefault((drow[self.hashcolumn], title), []).append(drow)
+        self.titleindex = titleindex
+
+    def write_duplicates_report(self, reportfile):
+        """Write a JSON report of duplicate checksums in the DROID export
+        and the paths that share them so that the sub-series mask can be
+        checked before creating the Rosetta CSV.
+        """
+        report = [
+            {
+                "checksum": checksum,
+                "count": len(self.droidindex[checksum]),
+                "paths": [drow["FILE_PATH"] for drow in self.droidindex[checksum]],
+            }
+            for checksum in sorted(self.duplicates)
+        ]
+        logger.info(
+            "writing duplicates report for %s checksums to: '%s'",
+            len(report),
+            reportfile,
+        )
+        with open(reportfile, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2, ensure_ascii=False)
@@ -0,0 +1,44 @@
+"""Compact DROID row.
+
+DROID exports can run to millions of rows which are held for the whole
+run. Rather than a dict per row, each row holds a tuple of the values it
+needs and shares a column -> index map with the other rows of its export.
+"""
+
+from collections.abc import Mapping
+
+
+class DroidRow(Mapping):
+    """Read-only DROID row that can be used like a dictionary."""
+
+    __slots__ = ("_columns", "_values")
+
+    def __init__(self, columns, values):
+        self._columns = columns
+        self._values = values
+
+    @staticmethod
+    def column_index(columns):
+        """Return a column -> index map to share between rows."""
+        return {column: idx for idx, column in enumerate(columns)}
+
+    def __getitem__(self, column):
+        return self._values[self._columns[column]]
+
+    def __contains__(self, column):
+        return column in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def get(self, key, default=None):
+        idx = self._columns.get(key)
+        if idx is None:
+            return default
+        return self._values[idx]
+
+    def __repr__(self):
+        return f"DroidRow({dict(self)!r})"
@@ -0,0 +1,244 @@
+"""Fixity verification.
+
+Before ingest the files of a transfer are hashed again and compared with
+the checksums DROID recorded for them, so that files changed or lost on
+the work-copy share since they were profiled are caught before a SIP is
+created. Files are hashed in parallel in a pool of processes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from a file at a time while hashing it.
+FIXITY_CHUNK_SIZE = 1024 * 1024
+
+# Files handed to a worker process at a time.
+FIXITY_BATCH_SIZE = 64
+
+VERIFIED = "verified"
+MISMATCHED = "mismatched"
+MISSING = "missing"
+UNREADABLE = "unreadable"
+NO_CHECKSUM = "no checksum"
+
+
+def hash_algorithm(hashcolumn):
+    """Return the hashlib algorithm for a DROID hash column, e.g. md5
+    for MD5_HASH.
+    """
+    algorithm = hashcolumn.lower()
+    if algorithm.endswith("_hash"):
+        algorithm = algorithm[: -len("_hash")]
+    if algorithm not in hashlib.algorithms_available:
+        raise ValueError(f"no hash algorithm for DROID column: {hashcolumn}")
+    return algorithm
+
+
+def hash_file(path, algorithm, chunk_size=FIXITY_CHUNK_SIZE):
+    """Return the hex digest of a file and its size in bytes.
+
+    The file is read into a single reusable buffer rather than a new
+    bytes object per read.
+    """
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    size = 0
+    with open(path, "rb", buffering=0) as hashed_file:
+        while True:
+            read = hashed_file.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+            size += read
+    return digest.hexdigest(), size
+
+
+def verify_file(path, expected, algorithm, chunk_size=FIXITY_CHUNK_SIZE):
+    """Verify a single file against its expected checksum.
+
+    Returns the status of the file, its checksum and its size.
+    """
+    if not expected:
+        return NO_CHECKSUM, None, 0
+    try:
+        checksum, size = hash_file(path, algorithm, chunk_size)
+    except FileNotFoundError:
+        return MISSING, None, 0
+    except OSError as err:
+        return UNREADABLE, str(err), 0
+    if checksum != expected.strip().lower():
+        return MISMATCHED, checksum, size
+    return VERIFIED, checksum, size
+
+
+def verify_batch(batch, algorithm, chunk_size=FIXITY_CHUNK_SIZE):
+    """Verify a batch of (path, expected) files in a worker process."""
+    return [
+        verify_file(path, expected, algorithm, chunk_size) for path, expected in batch
+    ]
+
+
+class FixityReport:
+    """Fixity verification report class."""
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.files = 0
+        self.bytes = 0
+        self.counts = {
+            status: 0
+            for status in (VERIFIED, MISMATCHED, MISSING, UNREADABLE, NO_CHECKSUM)
+        }
+        self.failures = {status: [] for status in self.counts if status != VERIFIED}
+
+    def add(self, file, result):
+        """Record the result of verifying a file.
+
+        `file` is the (path, expected checksum) verified and `result` the
+        (status, detail, size) returned by verify_file.
+        """
+        path, expected = file
+        status, detail, size = result
+        self.files += 1
+        self.bytes += size
+        self.counts[status] += 1
+        if status == VERIFIED:
+            return
+        failure = {"path": path, "expected": expected}
+        if status == MISMATCHED:
+            failure["actual"] = detail
+        elif status == UNREADABLE:
+            failure["error"] = detail
+        self.failures[status].append(failure)
+
+    @property
+    def ok(self):
+        """Return True if every file matched its DROID checksum."""
+        return self.counts[VERIFIED] == self.files
+
+    def as_dict(self):
+        """Return the report as a dictionary."""
+        return {
+            "algorithm": self.algorithm,
+            "files": self.files,
+            "bytes": self.bytes,
+            **self.counts,
+            "failures": self.failures,
+        }
+
+    def write_json(self, output):
+        """Write the report as JSON to a file-like object."""
+        json.dump(self.as_dict(), output, indent=2, ensure_ascii=False)
+        output.write("\n")
+
+
+class FixityVerifier:
+    """Fixity verification class."""
+
+    def __init__(self, workers=None, chunk_size=FIXITY_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def batches(self, files):
+        """Yield the files to verify in batches for the worker processes."""
+        batch = []
+        for path, expected in files:
+            batch.append((path, expected))
+            if len(batch) == FIXITY_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def verify(self, files, algorithm):
+        """Verify (path, expected checksum) files.
+
+        Returns a FixityReport.
+        """
+        report = FixityReport(algorithm)
+        batches = list(self.batches(files))
+        if self.workers == 1:
+            # not worth starting a process for.
+            results = (
+                verify_batch(batch, algorithm, self.chunk_size) for batch in batches
+            )
+            self.collect(report, batches, results)
+            return report
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = executor.map(
+                verify_batch,
+                batches,
+                [algorithm] * len(batches),
+                [self.chunk_size] * len(batches),
+            )
+            self.collect(report, batches, results)
+        return report
+
+    def collect(self, report, batches, results):
+        """Add the results of each batch to the report, in order."""
+        for batch, batch_results in zip(batches, results):
+            for file, result in zip(batch, batch_results):
+                report.add(file, result)
+                if result[0] != VERIFIED:
+                    logger.warning("fixity %s: '%s'", result[0], file[0])
+
+
+def fixity_path(droid_row, pathmask, root=None):
+    """Return the path to verify the fixity of a DROID row at.
+
+    With a `root`, the file is found under it by its path with the path
+    mask removed, e.g. once copied to a work-copy share.
+    """
+    file_path = droid_row["FILE_PATH"].strip()
+    if not root:
+        return file_path
+    relative = file_path.replace(pathmask, "", 1).replace("\\", "/")
+    return str(Path(root, *[part for part in relative.split("/") if part]))
+
+
+def verify_fixity(csvgen, root=None, workers=None):
+    """Hash the files in the DROID exports of a generator again and
+    compare them with the checksums DROID recorded.
+
+    Returns a FixityReport.
+    """
+    if csvgen.droidcsv is False:
+        return None
+    droid = csvgen.read_droid_index()
+    if not droid.droidlist:
+        return FixityReport(None)
+    try:
+        algorithm = hash_algorithm(droid.hashcolumn)
+    except ValueError as err:
+        logger.error("unable to verify fixity: %s", err)
+        sys.exit(1)
+    verifier = FixityVerifier(workers)
+    logger.info(
+        "verifying fixity of %s files with %s workers",
+        len(droid.droidlist),
+        verifier.workers,
+    )
+    files = (
+        (fixity_path(drow, csvgen.pathmask, root), drow[droid.hashcolumn])
+        for drow in droid.droidlist
+    )
+    with csvgen.metrics.phase("fixity"):
+        report = verifier.verify(files, algorithm)
+    logger.info(
+        "fixity: %s of %s files verified, %s mismatched, %s missing, %s unreadable, %s without a checksum",
+        report.counts[VERIFIED],
+        report.files,
+        report.counts[MISMATCHED],
+        report.counts[MISSING],
+        report.counts[UNREADABLE],
+        report.counts[NO_CHECKSUM],
+    )
+    return report
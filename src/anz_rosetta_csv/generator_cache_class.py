@@ -0,0 +1,116 @@
+"""In-memory generator cache.
+
+A long-running process, e.g. the job server, creates many Rosetta CSVs
+from the same schemas, configs and DROID exports. Parsed schemas, Rosetta
+CSV sections and DROID indexes are kept in least recently used caches
+keyed by the fingerprint of the files they were read from, so they are
+read again only when those files change.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Entries kept in each cache. DROID indexes hold every row of their
+# exports so fewer are kept.
+SCHEMA_CACHE_SIZE = 32
+SECTIONS_CACHE_SIZE = 32
+DROID_CACHE_SIZE = 4
+
+
+def file_fingerprint(paths):
+    """Return the fingerprint of one or more files: their path, size and
+    modification time.
+    """
+    if isinstance(paths, (str, bytes, os.PathLike)):
+        paths = [paths]
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append(
+            (str(Path(os.fsdecode(path)).resolve()), stat.st_size, stat.st_mtime_ns)
+        )
+    return tuple(fingerprint)
+
+
+class LRUCache:
+    """Thread-safe least recently used cache class."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return a cached value, or None if it isn't cached."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used if full."""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_or_create(self, key, create):
+        """Return a cached value, creating and caching it if it isn't
+        cached.
+
+        The value is created outside the lock, two threads missing the
+        same key may both create it.
+        """
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Remove every entry."""
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """Return the size and hit rate of the cache."""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class GeneratorCache:
+    """Generator cache class."""
+
+    def __init__(
+        self,
+        schema_size=SCHEMA_CACHE_SIZE,
+        sections_size=SECTIONS_CACHE_SIZE,
+        droid_size=DROID_CACHE_SIZE,
+    ):
+        self.schemas = LRUCache(schema_size)
+        self.sections = LRUCache(sections_size)
+        self.droid_indexes = LRUCache(droid_size)
+
+    def stats(self):
+        """Return the stats of each cache."""
+        return {
+            "schemas": self.schemas.stats(),
+            "sections": self.sections.stats(),
+            "droid indexes": self.droid_indexes.stats(),
+        }
@@ -0,0 +1,122 @@
+"""Rosetta CSV generator checkpoint.
+
+Records progress through the list control and the bytes of the Rosetta
+CSV committed to disk so that a run that is interrupted, e.g. by a
+logoff or reboot, can resume from its last commit and produce the same
+output.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# List control items written between commits.
+CHECKPOINT_INTERVAL = 1000
+
+
+class GeneratorCheckpoint:
+    """Rosetta CSV generator checkpoint class."""
+
+    # increment when the structure of the checkpoint changes.
+    checkpoint_version = 1
+
+    def __init__(self, checkpointdir, outputfile, inputs, interval=CHECKPOINT_INTERVAL):
+        self.checkpointdir = Path(checkpointdir)
+        self.outputfile = Path(outputfile)
+        self.inputs = [str(inputfile) for inputfile in inputs if inputfile]
+        self.interval = interval
+        self.state = None
+
+    @property
+    def checkpoint_file(self):
+        """Return the file the checkpoint is stored in."""
+        return self.checkpointdir / "checkpoint.json"
+
+    def fingerprint(self):
+        """Return the fingerprint of the inputs to the run: their size and
+        modification time, a run only resumes if none have changed.
+        """
+        fingerprint = []
+        for inputfile in self.inputs:
+            stat = os.stat(inputfile)
+            fingerprint.append(
+                {
+                    "path": str(Path(inputfile).resolve()),
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+            )
+        return fingerprint
+
+    def load(self):
+        """Load the checkpoint of an interrupted run.
+
+        Returns the state of the last commit, or None if the run can't
+        be resumed and needs to start from the beginning.
+        """
+        self.state = None
+        if not self.checkpoint_file.is_file():
+            return None
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as checkpoint:
+                state = json.load(checkpoint)
+        except (OSError, ValueError) as err:
+            logger.warning(
+                "ignoring unreadable checkpoint '%s': %s", self.checkpoint_file, err
+            )
+            return None
+        if (
+            state.get("version") != self.checkpoint_version
+            or state.get("output") != str(self.outputfile.resolve())
+            or state.get("fingerprint") != self.fingerprint()
+        ):
+            logger.warning(
+                "inputs or output have changed since checkpoint '%s', starting again",
+                self.checkpoint_file,
+            )
+            return None
+        if (
+            not self.outputfile.is_file()
+            or self.outputfile.stat().st_size < state["offset"]
+        ):
+            logger.warning(
+                "output '%s' is shorter than its checkpoint, starting again",
+                self.outputfile,
+            )
+            return None
+        logger.info(
+            "resuming from checkpoint after %s list control items", state["items"]
+        )
+        self.state = state
+        return state
+
+    def commit(self, output, progress):
+        """Commit the output written so far and record the progress made
+        through the list control: the `items` written, the next `line` and
+        `rnumber`, and the metrics `counters` so far.
+        """
+        output.flush()
+        os.fsync(output.fileno())
+        state = {
+            "version": self.checkpoint_version,
+            "output": str(self.outputfile.resolve()),
+            "fingerprint": self.fingerprint(),
+            "offset": output.tell(),
+            **progress,
+        }
+        self.checkpointdir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.checkpoint_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(tmp_file, self.checkpoint_file)
+        logger.debug(
+            "checkpoint committed after %s list control items", progress["items"]
+        )
+
+    def complete(self):
+        """Remove the checkpoint once the run is complete."""
+        if self.checkpoint_file.is_file():
+            self.checkpoint_file.unlink()
@@ -0,0 +1,50 @@
+"""Rosetta CSV generator metrics."""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+class GeneratorMetrics:
+    """Timings for each phase of a run and counters for the work done.
+
+    Metrics can be updated from more than one thread, e.g. when SIP
+    shards are written concurrently.
+    """
+
+    def __init__(self, counters=None):
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.counters = {}
+        for counter in counters or []:
+            self.counters[counter] = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the run.
+
+        Phases that run more than once, e.g. for each list control item,
+        accumulate their time.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def increment(self, name, amount=1):
+        """Increment a counter."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self):
+        """Return the metrics as a dictionary."""
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def write_json(self, metricsfile):
+        """Write the metrics to a JSON file."""
+        with open(metricsfile, "w", encoding="utf-8") as metrics_file:
+            json.dump(self.as_dict(), metrics_file, indent=2)
@@ -0,0 +1,142 @@
+"""CSV constraint validation for JSON Table Schema.
+
+Field constraints are compiled once into per-column validators, e.g.
+regular expressions are compiled up-front, so that rows can be checked
+as quickly as they are read or written.
+
+Constraints other than `required` only apply to non-empty values, which
+is how JSON Table Schema treats missing values.
+
+More info: http://www.dataprotocols.org/en/latest/json-table-schema.html
+"""
+
+# pylint: disable=R0903
+
+import csv
+import re
+
+
+class ColumnValidator:
+    """Validate values in a single column against a field's constraints."""
+
+    def __init__(self, name, constraints):
+        self.name = name
+        self.required = constraints.get("required", False) is True
+        self.seen = set() if constraints.get("unique", False) is True else None
+        self.checks = []
+
+        min_length = constraints.get("minLength")
+        if min_length is not None:
+            self.checks.append(
+                (
+                    lambda value, limit=min_length: len(value) >= limit,
+                    f"shorter than minLength {min_length}",
+                )
+            )
+        max_length = constraints.get("maxLength")
+        if max_length is not None:
+            self.checks.append(
+                (
+                    lambda value, limit=max_length: len(value) <= limit,
+                    f"longer than maxLength {max_length}",
+                )
+            )
+        pattern = constraints.get("pattern")
+        if pattern:
+            # a match object is truthy, None is not.
+            self.checks.append(
+                (re.compile(pattern).search, f"doesn't match pattern '{pattern}'")
+            )
+        minimum = constraints.get("minimum")
+        if minimum is not None:
+            self.checks.append(
+                (
+                    lambda value, limit=minimum: _number(value) >= limit,
+                    f"less than minimum {minimum}",
+                )
+            )
+        maximum = constraints.get("maximum")
+        if maximum is not None:
+            self.checks.append(
+                (
+                    lambda value, limit=maximum: _number(value) <= limit,
+                    f"greater than maximum {maximum}",
+                )
+            )
+
+    @property
+    def has_constraints(self):
+        """Return True if there is anything to validate in this column."""
+        return self.required or self.seen is not None or bool(self.checks)
+
+    def validate(self, value):
+        """Validate a value and return a list of error messages."""
+        if value == "":
+            if self.required:
+                return ["value is required"]
+            return []
+        errors = [message for check, message in self.checks if not check(value)]
+        if self.seen is not None:
+            if value in self.seen:
+                errors.append("value is not unique")
+            self.seen.add(value)
+        return errors
+
+
+class TableValidator:
+    """Validate CSV rows against the fields of a JSON Table Schema.
+
+    Columns are validated by position so that CSV headers that repeat a
+    field name can still be validated.
+    """
+
+    def __init__(self, fields):
+        self.columns = [
+            ColumnValidator(field["name"], field.get("constraints", {}))
+            for field in fields
+        ]
+        self.active = [
+            (idx, column)
+            for idx, column in enumerate(self.columns)
+            if column.has_constraints
+        ]
+
+    def validate_row(self, row, line=None):
+        """Validate a row and return a list of (line, column, value,
+        message) errors.
+        """
+        errors = []
+        width = len(self.columns)
+        if len(row) != width:
+            errors.append(
+                (line, None, None, f"row has {len(row)} columns, schema has {width}")
+            )
+            row = list(row) + [""] * (width - len(row))
+        for idx, column in self.active:
+            value = row[idx]
+            # most cells are empty, skip them without calling the validator.
+            if value == "" and not column.required:
+                continue
+            for message in column.validate(value):
+                errors.append((line, column.name, value, message))
+        return errors
+
+    def validate_csv(self, csvfname):
+        """Validate an existing CSV, skipping its header, and yield its
+        errors.
+        """
+        with open(csvfname, "r", encoding="utf-8", newline="") as csv_file:
+            csv_reader = csv.reader(csv_file, delimiter=",", quotechar='"')
+            next(csv_reader, None)
+            for row in csv_reader:
+                yield from self.validate_row(row, csv_reader.line_num)
+
+
+def _number(value):
+    """Return a value as a number for minimum and maximum constraints,
+    values that aren't numbers fail the constraint.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
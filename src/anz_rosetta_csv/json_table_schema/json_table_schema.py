@@ -20,13 +20,7 @@ it under the terms of the Apache Software Licence v2.0
 import json
 import sys
 
-try:
-    import csvdatatypes
-except ModuleNotFoundError:
-    try:
-        from src.anz_rosetta_csv.json_table_schema import csvdatatypes
-    except ModuleNotFoundError:
-        from anz_rosetta_csv.json_table_schema import csvdatatypes
+from . import csvconstraints, csvdatatypes
 
 
 class FormatError(Exception):
@@ -131,6 +125,11 @@ class JSONTableSchema:
 
                 field_dict[key] = field[key]
 
+        for key in self.optional_field_descriptor_keys_lists:
+            if key in field:
+                self.check_constraints(field[key], field["name"])
+                field_dict[key] = field[key]
+
         self.fields.append(field_dict)
 
     def remove_field(self, field_name):
@@ -150,6 +149,21 @@ class JSONTableSchema:
         csv_header = f'"{joined}"'
         return csv_header.strip()
 
+    def check_constraints(self, constraints, field_name):
+        if not isinstance(constraints, dict):
+            err_tmpl = f"Field `constraints' must be a hash for `{field_name}'"
+            raise FormatError(err_tmpl)
+        for key in constraints:
+            if key not in self.optional_constraints_keys:
+                err_tmpl = (
+                    f"Invalid constraint `{key}' in field descriptor for `{field_name}'"
+                )
+                raise FormatError(err_tmpl)
+
+    def compile_validators(self):
+        """Compile field constraints into a validator for CSV rows."""
+        return csvconstraints.TableValidator(self.fields)
+
     def check_type(self, field_type, field_name):
         type_found = False
         for field_category in csvdatatypes.__valid_type_names__:
@@ -0,0 +1,100 @@
+"""Pipelined output writer.
+
+Writes the Rosetta CSV from a background thread so that rows can be
+created while earlier rows are still being written, e.g. to a network
+share. The queue between them is bounded so a slow output holds back
+row creation rather than the whole CSV being held in memory.
+"""
+
+import queue
+import threading
+
+# Writes waiting in the queue before row creation waits for the output.
+PIPELINE_QUEUE_SIZE = 256
+
+# Seconds to wait on the queue before checking the writer is still alive.
+PIPELINE_POLL_INTERVAL = 0.1
+
+
+class PipelineWriter:
+    """Pipelined output writer class.
+
+    Work is done in the order it is submitted. An error in the writer
+    thread is raised in the submitting thread on its next submit or
+    when the writer is closed.
+    """
+
+    def __init__(self, output, metrics=None, maxsize=PIPELINE_QUEUE_SIZE):
+        self.output = output
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(
+            target=self._run, name="rosetta-csv-writer", daemon=True
+        )
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # don't hide the original error with one from the writer.
+            self._stop()
+
+    def _run(self):
+        while True:
+            work = self.queue.get()
+            if work is None:
+                return
+            if self.error is not None:
+                # drain the queue so the submitting thread isn't blocked.
+                continue
+            func, args = work
+            try:
+                if self.metrics is not None:
+                    with self.metrics.phase("write"):
+                        func(*args)
+                else:
+                    func(*args)
+            except BaseException as err:  # pylint: disable=W0718
+                self.error = err
+
+    def _put(self, work):
+        while True:
+            self.raise_error()
+            try:
+                self.queue.put(work, timeout=PIPELINE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def raise_error(self):
+        """Raise an error from the writer thread, if there was one."""
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, func, *args):
+        """Submit work to be done in order with the writes, e.g. to
+        commit a checkpoint once everything before it is written.
+        """
+        self._put((func, args))
+
+    def write(self, text):
+        """Write text to the output."""
+        self._put((self.output.write, (text,)))
+
+    def _stop(self):
+        # the writer keeps taking work after an error, so this won't block
+        # for long.
+        self.queue.put(None)
+        self.thread.join()
+
+    def close(self):
+        """Wait for all writes to complete and raise any error from the
+        writer thread.
+        """
+        self._stop()
+        self.raise_error()
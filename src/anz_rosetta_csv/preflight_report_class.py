@@ -0,0 +1,140 @@
+"""Pre-flight join report.
+
+Most failed runs are list control items that don't match a DROID row,
+which only show up as empty cells once the whole Rosetta CSV has been
+created. A pre-flight run only joins the list control to the DROID
+exports and reports what did and didn't match, with samples of each
+problem to follow up.
+"""
+
+import json
+import logging
+
+from .droid_index_class import normalize_spaces
+
+logger = logging.getLogger(__name__)
+
+# Samples of each problem kept in the report.
+PREFLIGHT_SAMPLES = 10
+
+MATCHED = "matched"
+UNMATCHED = "unmatched"
+AMBIGUOUS = "ambiguous duplicates"
+ORPHANED = "orphaned droid rows"
+
+
+class PreflightReport:
+    """Pre-flight join report class."""
+
+    categories = (MATCHED, UNMATCHED, AMBIGUOUS, ORPHANED)
+
+    def __init__(self, samples=PREFLIGHT_SAMPLES):
+        self.max_samples = samples
+        self.items = 0
+        self.droid_rows = 0
+        self.counts = {category: 0 for category in self.categories}
+        self.samples = {
+            category: [] for category in self.categories if category != MATCHED
+        }
+
+    def add(self, category, sample=None):
+        """Count an item, or DROID row, in a category and keep a sample
+        of it if there is room.
+        """
+        self.counts[category] += 1
+        samples = self.samples.get(category)
+        if (
+            sample is not None
+            and samples is not None
+            and len(samples) < self.max_samples
+        ):
+            samples.append(sample)
+
+    @property
+    def ok(self):
+        """Return True if every list control item matched a DROID row."""
+        return not self.counts[UNMATCHED] and not self.counts[AMBIGUOUS]
+
+    def as_dict(self):
+        """Return the report as a dictionary."""
+        return {
+            "list control items": self.items,
+            "droid rows": self.droid_rows,
+            **self.counts,
+            "samples": self.samples,
+        }
+
+    def write_json(self, output):
+        """Write the report as JSON to a file-like object."""
+        json.dump(self.as_dict(), output, indent=2, ensure_ascii=False)
+        output.write("\n")
+
+
+def unmatched_sample(droid, item):
+    """Return the category and a sample of a list control item that
+    doesn't match a DROID row, with why it doesn't.
+    """
+    checksum = item["Missing Comment"]
+    sample = {
+        "item code": item["Item Code"],
+        "title": item["Title"],
+        "sub-series": item["Sub-Series"],
+        "checksum": checksum,
+    }
+    candidates = droid.titleindex.get((checksum, normalize_spaces(item["Title"])))
+    if candidates and checksum in droid.duplicates:
+        sample["candidates"] = [drow["FILE_PATH"] for drow in candidates]
+        return AMBIGUOUS, sample
+    if checksum in droid.droidindex:
+        sample["reason"] = "title doesn't match a DROID file name"
+    else:
+        sample["reason"] = "checksum isn't in the DROID export"
+    return UNMATCHED, sample
+
+
+def preflight(csvgen, samples=PREFLIGHT_SAMPLES):
+    """Join the list control to the DROID exports of a generator without
+    creating the Rosetta CSV and report the items that don't match.
+
+    Returns a PreflightReport.
+    """
+    report = PreflightReport(samples)
+    if csvgen.droidcsv is False or csvgen.exportsheet is False:
+        return report
+    csvgen.read_sources()
+    # compiling the plan also checks the config against the schema.
+    csvgen.prepare_item_rows()
+
+    droid = csvgen.droid
+    exportlist = csvgen.exportlist or []
+    report.items = len(exportlist)
+    report.droid_rows = len(droid.droidlist)
+    matched = set()
+    with csvgen.metrics.phase("join"):
+        for item in exportlist:
+            droid_row = csvgen.resolve_droid_row(
+                checksum=item["Missing Comment"],
+                lc_title=item["Title"],
+                lc_sub_series=item["Sub-Series"],
+            )
+            if droid_row is not None:
+                matched.add(id(droid_row))
+                report.add(MATCHED)
+                continue
+            csvgen.metrics.increment("unmatched items")
+            report.add(*unmatched_sample(droid, item))
+    for drow in droid.droidlist:
+        if id(drow) not in matched:
+            report.add(
+                ORPHANED,
+                {"file path": drow["FILE_PATH"], "checksum": drow[droid.hashcolumn]},
+            )
+    logger.info(
+        "pre-flight: %s of %s list control items matched, %s unmatched, %s ambiguous duplicates, %s orphaned DROID rows",
+        report.counts[MATCHED],
+        report.items,
+        report.counts[UNMATCHED],
+        report.counts[AMBIGUOUS],
+        report.counts[ORPHANED],
+    )
+    return report
@@ -3,13 +3,7 @@
 import logging
 from os.path import exists
 
-try:
-    from droid_csv_handler_class import GenericCSVHandler
-except ModuleNotFoundError:
-    try:
-        from src.anz_rosetta_csv.droid_csv_handler_class import GenericCSVHandler
-    except ModuleNotFoundError:
-        from anz_rosetta_csv.droid_csv_handler_class import GenericCSVHandler
+from .droid_csv_handler_class import GenericCSVHandler
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +12,7 @@ class ProvenanceCSVHandler:
     """Provenance CSV handler class."""
 
     provheaders = ["RECORDNUMBER", "NOTEDATE", "NOTETEXT"]
+    provoverrides = ["ORIGINALNAME", "CHECKSUM"]
 
     def read_provenance_csv(self, provcsvname):
         """Read provenance CSV and return it to the caller."""
@@ -29,7 +24,9 @@ class ProvenanceCSVHandler:
             )
         if exists(provcsvname):
             csvhandler = GenericCSVHandler()
-            exportlist = csvhandler.csv_as_list(provcsvname)
+            exportlist = csvhandler.csv_as_list(
+                provcsvname, self.provheaders + self.provoverrides
+            )
             # counter a blank sheet
             if len(exportlist) < 1:
                 exportlist = None
@@ -39,3 +36,17 @@ class ProvenanceCSVHandler:
                         exportlist = None
                         break
         return exportlist
+
+    def index_provenance(self, provlist):
+        """Index provenance notes by RECORDNUMBER.
+
+        Returns a dictionary of RECORDNUMBER: [notes] so that a record
+        can have more than one provenance note, in the order they were
+        written in the provenance CSV.
+        """
+        provindex = {}
+        if provlist is None:
+            return provindex
+        for note in provlist:
+            provindex.setdefault(note["RECORDNUMBER"], []).append(note)
+        return provindex
@@ -0,0 +1,157 @@
+"""Parsed, read-only configuration.
+
+Config files are parsed once and the result shared by every component
+that needs it, e.g. the generator and the Rosetta CSV sections. Parsed
+configs are cached by path and only parsed again when the file changes,
+so batch runs that reuse a config don't read it for every transfer. The
+least recently used configs are dropped once the cache is full, so a
+long-running server doesn't keep every config it has seen.
+"""
+
+import configparser as ConfigParser
+import logging
+import os
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+
+from .generator_cache_class import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Parsed configs kept in the cache.
+CONFIG_CACHE_SIZE = 32
+
+
+@dataclass(frozen=True, eq=False)
+class RosettaConfig:
+    """Read-only configuration class.
+
+    Offers the lookups of `RawConfigParser` that the generator uses.
+    Option names are case-insensitive, as in `RawConfigParser`.
+    """
+
+    configfile: object
+    # section -> option -> value, read-only.
+    values: Mapping
+
+    # configfile -> (modification time, size, config).
+    _cache = LRUCache(CONFIG_CACHE_SIZE)
+
+    @staticmethod
+    def optionxform(option):
+        """Return the name an option is stored under."""
+        return option.lower()
+
+    @classmethod
+    def parse(cls, configfile):
+        """Parse a config from a path or a file-like object."""
+        parser = ConfigParser.RawConfigParser()
+        if isinstance(configfile, (str, bytes, os.PathLike)):
+            with open(configfile, "r", encoding="utf-8") as config:
+                parser.read_file(config)
+        else:
+            parser.read_file(configfile)
+        values = {
+            section: MappingProxyType(dict(parser.items(section)))
+            for section in parser.sections()
+        }
+        return cls(configfile, MappingProxyType(values))
+
+    @classmethod
+    def load(cls, configfile, required_sections=()):
+        """Return the parsed config, from the cache if the file hasn't
+        changed since it was last parsed.
+
+        Exits if the config can't be read or any of `required_sections`
+        are missing from it.
+        """
+        try:
+            if isinstance(configfile, (str, bytes, os.PathLike)):
+                config = cls._load_file(configfile)
+            else:
+                # file-like objects can't be checked for changes.
+                config = cls.parse(configfile)
+        except (OSError, ConfigParser.Error) as err:
+            logger.error("unable to read config '%s': %s", configfile, err)
+            sys.exit(1)
+        missing = [
+            section for section in required_sections if not config.has_section(section)
+        ]
+        if missing:
+            logger.error(
+                "config '%s' is missing required sections: %s",
+                configfile,
+                ", ".join(f"[{section}]" for section in missing),
+            )
+            sys.exit(1)
+        return config
+
+    @classmethod
+    def _load_file(cls, configfile):
+        path = Path(os.fsdecode(configfile)).resolve()
+        stat = path.stat()
+        cached = cls._cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            logger.debug("using cached config '%s'", path)
+            return cached[2]
+        logger.info("reading app config from '%s'", configfile)
+        config = cls.parse(configfile)
+        cls._cache.put(path, (stat.st_mtime_ns, stat.st_size, config))
+        return config
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget every parsed config."""
+        cls._cache.clear()
+
+    def sections(self):
+        """Return the names of the sections."""
+        return list(self.values)
+
+    def has_section(self, section):
+        """Return True if the section exists."""
+        return section in self.values
+
+    def has_option(self, section, option):
+        """Return True if the option exists in the section."""
+        return self.optionxform(option) in self.values.get(section, {})
+
+    def options(self, section):
+        """Return the names of the options in a section."""
+        return list(self._section(section))
+
+    def items(self, section):
+        """Return the (option, value) pairs of a section."""
+        return list(self._section(section).items())
+
+    def get(self, section, option):
+        """Return the value of an option."""
+        values = self._section(section)
+        try:
+            return values[self.optionxform(option)]
+        except KeyError:
+            raise ConfigParser.NoOptionError(option, section) from None
+
+    def getint(self, section, option):
+        """Return the value of an option as an int."""
+        return int(self.get(section, option))
+
+    def getboolean(self, section, option):
+        """Return the value of an option as a boolean."""
+        value = self.get(section, option)
+        try:
+            return ConfigParser.RawConfigParser.BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise ValueError(f"not a boolean: {value}") from None
+
+    def _section(self, section):
+        try:
+            return self.values[section]
+        except KeyError:
+            raise ConfigParser.NoSectionError(section) from None
+
+    def __repr__(self):
+        return f"RosettaConfig({self.configfile!r})"
@@ -5,40 +5,52 @@
 # pylint: disable=R1710; # all-return statements must return.
 # pylint: disable=R0912; # too-many branches.
 
-import configparser as ConfigParser
+import csv
+import io
+import itertools
 import logging
 import sys
-
-try:
-    import json_table_schema
-    from droid_csv_handler_class import DroidCSVHandler, GenericCSVHandler
-    from import_sheet_generator import ImportSheetGenerator
-    from provenance_csv_handler_class import ProvenanceCSVHandler
-    from rosetta_csv_sections_class import RosettaCSVSections
-except ModuleNotFoundError:
-    try:
-        from src.anz_rosetta_csv.droid_csv_handler_class import (
-            DroidCSVHandler,
-            GenericCSVHandler,
-        )
-        from src.anz_rosetta_csv.import_sheet_generator import ImportSheetGenerator
-        from src.anz_rosetta_csv.json_table_schema import json_table_schema
-        from src.anz_rosetta_csv.provenance_csv_handler_class import (
-            ProvenanceCSVHandler,
-        )
-        from src.anz_rosetta_csv.rosetta_csv_sections_class import RosettaCSVSections
-    except ModuleNotFoundError:
-        from anz_rosetta_csv.droid_csv_handler_class import (
-            DroidCSVHandler,
-            GenericCSVHandler,
-        )
-        from anz_rosetta_csv.import_sheet_generator import ImportSheetGenerator
-        from anz_rosetta_csv.json_table_schema import json_table_schema
-        from anz_rosetta_csv.provenance_csv_handler_class import ProvenanceCSVHandler
-        from anz_rosetta_csv.rosetta_csv_sections_class import RosettaCSVSections
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .droid_csv_handler_class import DroidCSVHandler, GenericCSVHandler
+from .droid_index_cache_class import DroidIndexCache
+from .droid_index_class import (
+    HASH_COLUMNS,
+    DroidIndex,
+    droid_title,
+    expand_droid_csvs,
+    normalize_spaces,
+    select_hash_column,
+    subseries_path,
+)
+from .generator_cache_class import file_fingerprint
+from .generator_checkpoint_class import GeneratorCheckpoint
+from .generator_metrics_class import GeneratorMetrics
+from .json_table_schema import json_table_schema
+from .pipeline_writer_class import PipelineWriter
+from .provenance_csv_handler_class import ProvenanceCSVHandler
+from .rosetta_config_class import RosettaConfig
+from .rosetta_csv_sections_class import RosettaCSVSections
 
 logger = logging.getLogger(__name__)
 
+# Counters reported in the generator's metrics.
+METRICS_COUNTERS = (
+    "droid lookups",
+    "duplicate resolutions",
+    "provenance overrides",
+    "unmatched items",
+    "validation errors",
+)
+
+# Config sections without which no Rosetta CSV can be generated.
+REQUIRED_CONFIG_SECTIONS = ("rosetta csv fields", "rosetta mapping")
+
+# Validation errors logged before only being counted.
+MAX_LOGGED_VALIDATION_ERRORS = 100
+
 
 def ingest_path_from_droid_row(droid_row: dict, path_mask: str) -> str:
     """Return an ingest path from a droid row with pathmask removed."""
@@ -49,54 +61,118 @@ def ingest_path_from_droid_row(droid_row: dict, path_mask: str) -> str:
     return ingest_path.strip()
 
 
-def find_path_from_subseries(
-    record_title: str, droid_row: dict, lc_sub_series: str, series_mask: str
-) -> bool:
-    """Determine the path to add to the CSV from its sub-series.
-
-    Example:
+def csv_rows(rows):
+    """Return rows as CSV.
 
-        pathmask is: "R:\\Digitised\\Wellington\\mock_transfer\\" (we zip the contents from what is remaining)
-
-        droid path: "R:\\Digitised\\Wellington\\mock_transfer\\2006-2007 Project Programme\\2006-07 Project Programme Submission to MoU\\2006-07 Rules Bid_ (🥬) Letter.doc"
+    Every cell is quoted and quotes inside values are escaped by
+    doubling them. A writer is created per call so rows can be
+    rendered from several threads at once.
+    """
+    output = io.StringIO()
+    csv_writer = csv.writer(output, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    csv_writer.writerows(rows)
+    return output.getvalue()
 
-        desired subseries: "Project Programme\\"
 
-        given the desired subseries we need to strip the following from the DROID path: "R:\\Digitised\\Wellington\\mock_transfer\\2006-2007 "
+class StaticValue:
+    """Resolve a field from `[static values]` in the config."""
 
-        the droid path now looks like: "Project Programme\\2006-07 Project Programme Submission to MoU\\2006-07 Rules Bid_ (🥬) Letter.doc"
+    def __init__(self, value):
+        self.value = value
 
-        the file name is removed (this sounds counter-intuitive but it can only be removed IF it matches) leaving: "Project Programme\\2006-07 Project Programme Submission to MoU\\"
+    def __call__(self, listcontrolitem, rnumber, droid_row):
+        return self.value
 
-        which is compared to the list control: "Project Programme\\2006-07 Project Programme Submission to MoU"
 
-        we now do the comparison: "Project Programme\\2006-07 Project Programme Submission to MoU\\" (calculated from the DROID sheet) is equal to "Project Programme\\2006-07 Project Programme Submission to MoU" (in the list control)
+class ListControlValue:
+    """Resolve a field mapped to the list control via `[rosetta mapping]`.
 
+    Access restrictions are translated to their Rosetta access code via
+    `[access values]` when `access_values` is provided.
     """
 
-    file_name = droid_row["NAME"].strip()
-    file_path = droid_row["FILE_PATH"].strip()
+    def __init__(self, column, access_values=None):
+        self.column = column
+        self.access_values = access_values
 
-    logger.debug("DROID row filename: '%s'", file_path)
-    logger.debug("DROID row path: '%s'", file_path)
+    def __call__(self, listcontrolitem, rnumber, droid_row):
+        value = listcontrolitem[self.column]
+        if self.access_values is not None:
+            # config options are case-insensitive.
+            value = self.access_values.get(value.lower(), value)
+        return value
 
-    if record_title.strip() not in file_path:
-        logger.error("record title '%s' not in DROID filename", record_title)
-        return False
 
-    logger.debug("list control sub-series mask: '%s'", series_mask)
-    logger.debug("record title: '%s'", record_title)
+class DroidValue:
+    """Resolve a field mapped to the DROID export via `[droid mapping]`.
 
-    compare = file_path.replace(file_name, "").replace(series_mask, "", 1).strip()[:-1]
-
-    logger.debug(
-        "string to compare with sub-series: '%s' and sub_series: '%s' matches: '%s'",
-        compare,
-        lc_sub_series,
-        (compare == lc_sub_series),
-    )
+    If `override_column` is provided, a provenance note for the record
+    that isn't marked "ignore" takes precedence over the DROID value.
+    """
 
-    return compare == lc_sub_series
+    def __init__(
+        self,
+        field,
+        droid_column,
+        path_mask,
+        override_column=None,
+        provindex=None,
+        metrics=None,
+    ):
+        self.field = field
+        self.droid_column = droid_column
+        self.path_mask = path_mask
+        self.override_column = override_column
+        self.provindex = provindex
+        self.metrics = metrics
+
+    def __call__(self, listcontrolitem, rnumber, droid_row):
+        if self.override_column is not None:
+            override = None
+            for note in self.provindex.get(rnumber, []):
+                if note[self.override_column].lower().strip() != "ignore":
+                    override = note[self.override_column]
+            if override is not None:
+                if self.metrics is not None:
+                    self.metrics.increment("provenance overrides")
+                return override
+        if droid_row is None:
+            return ""
+        if self.field == "File Original Path":
+            return ingest_path_from_droid_row(
+                droid_row=droid_row, path_mask=self.path_mask
+            )
+        return droid_row[self.droid_column]
+
+
+class ProvenanceEventValue:
+    """Resolve an event field from the provenance notes for a record."""
+
+    event_values = {
+        "Event Identifier Type": "EXTERNAL",
+        "Event Identifier Value": "EXT_1",
+        "Event Type": "CREATION",
+        "Event Description": "Provenance Note",
+        "Event Outcome1": "SUCCESS",
+    }
+    event_columns = {
+        "Event Date": "NOTEDATE",
+        "Event Outcome Detail1": "NOTETEXT",
+    }
+
+    def __init__(self, field, provindex, default=None):
+        self.field = field
+        self.provindex = provindex
+        self.default = default
+
+    def __call__(self, listcontrolitem, rnumber, droid_row):
+        value = self.default
+        for note in self.provindex.get(rnumber, []):
+            if self.field in self.event_columns:
+                value = note[self.event_columns[self.field]]
+            else:
+                value = self.event_values[self.field]
+        return value
 
 
 class RosettaCSVGenerator:
@@ -117,32 +193,59 @@ class RosettaCSVGenerator:
         rosettaschema=None,
         configfile=None,
         provenance=None,
+        duplicatesreport=None,
+        cachedir=None,
+        validate=False,
+        checkpointdir=None,
+        sharder=None,
+        pipeline=False,
+        memcache=None,
     ):
         if not configfile:
             logger.error("a configuration file hasn't been provided")
             sys.exit(1)
 
+        self.metrics = GeneratorMetrics(METRICS_COUNTERS)
+
         self.subseriesmask = None
         self.rnumber = None
-        self.droidlist = None
+        self.droidcsvs = None
+        self.droid = None
         self.exportlist = None
         self.provlist = None
-        self.duplicates = None
-
-        logging.info("reading app config from '%s'", configfile)
-        self.config = ConfigParser.RawConfigParser()
-        self.config.read(configfile, encoding="utf-8")
+        self.provindex = {}
+        self.subseriesindex = None
+        self.duplicatesreport = duplicatesreport
+        self.cachedir = cachedir
+        self.validate = validate
+        self.checkpointdir = checkpointdir
+        self.sharder = sharder
+        self.pipeline = pipeline
+        self.memcache = memcache
+        self.configfile = configfile
+        self.rosettavalidator = None
+
+        with self.metrics.phase("config load"):
+            required_sections = ()
+            if droidcsv is not False and exportsheet is not False:
+                required_sections = REQUIRED_CONFIG_SECTIONS
+            self.config = RosettaConfig.load(configfile, required_sections)
+
+            # Grab Rosetta Sections
+            rs = self._cached(
+                "sections", configfile, lambda: RosettaCSVSections(self.config)
+            )
+            self.rosettasections = rs.sections
 
         self.droidcsv = droidcsv
         self.exportsheet = exportsheet
 
         # NOTE: A bit of a hack, compare with import schema work and refactor
         self.rosettaschema = rosettaschema
-        self.read_rosetta_schema()
-
-        # Grab Rosetta Sections
-        rs = RosettaCSVSections(configfile)
-        self.rosettasections = rs.sections
+        # fixity verification doesn't create rows so needs no schema.
+        if rosettaschema:
+            with self.metrics.phase("schema read"):
+                self.read_rosetta_schema()
 
         # set provenance flag and file
         self.prov = False
@@ -161,154 +264,205 @@ class RosettaCSVGenerator:
 
         self.pathmask = self.__setpathmask__()
 
-        # Get some functions from ImportGenerator
-        self.impgen = ImportSheetGenerator()
-
         # List duplicate items to check...
         self.duplicateitemsaddedset = set()
 
     def add_csv_value(self, value):
-        """Format the value for the CSV."""
-        value = value.replace("\r", "").replace("\n", "")
-        field = f'"{value}"'
-        return field
+        """Format the value for the CSV, quoting is left to the CSV
+        writer.
+        """
+        return value.replace("\r", "").replace("\n", "")
+
+    def _cached(self, cache, paths, create):
+        """Return a value created from files, from the in-memory cache if
+        one is given and the files haven't changed.
+        """
+        if self.memcache is None or not isinstance(paths, (str, list, Path)):
+            return create()
+        key = file_fingerprint(paths)
+        return getattr(self.memcache, cache).get_or_create(key, create)
+
+    def _parse_rosetta_schema(self):
+        """Parse the Rosetta Schema File."""
+        with open(self.rosettaschema, "r", encoding="utf-8") as rosetta_schema:
+            return json_table_schema.JSONTableSchema(rosetta_schema.read())
 
     def read_rosetta_schema(self):
         """Read the Rosetta Schema File."""
-        importschemajson = None
-        with open(self.rosettaschema, "r", encoding="utf-8") as rosetta_schema:
-            importschemajson = rosetta_schema.read()
-        importschema = json_table_schema.JSONTableSchema(importschemajson)
+        importschema = self._cached(
+            "schemas", self.rosettaschema, self._parse_rosetta_schema
+        )
 
         importschemadict = importschema.as_dict()
         importschemaheader = importschema.as_csv_header()
 
         self.rosettacsvheader = importschemaheader + "\n"
         self.rosettacsvdict = importschemadict["fields"]
-
-    def createcolumns(self, column_number):
-        """Create a number of empty columns in Rosetta CSV."""
-        columns = ""
-        for _ in range(column_number):
-            columns = f'{columns}"",'
-        return columns
+        self.rosettavalidator = importschema.compile_validators()
 
     def normalize_spaces(self, filename):
         """Normalize spacces in a filename."""
-        if filename.find("  ") != -1:
-            filename = filename.replace("  ", " ")
-            return self.normalize_spaces(filename)
-        return filename
+        return normalize_spaces(filename)
 
     def compare_filenames_as_titles(self, droidrow, listcontroltitle):
-        """Test filename titles to confirm equivalence."""
-        droid_filename_title = self.impgen.get_title(droidrow["NAME"])
-        normalized_droid_filename = self.normalize_spaces(droid_filename_title)
-        normalized_lc_title = self.normalize_spaces(listcontroltitle)
+        """Test filename titles to confirm equivalence.
+
+        Deprecated, list control items are matched to DROID rows by the
+        normalized titles in the title index.
+        """
+        warnings.warn(
+            "compare_filenames_as_titles is deprecated, DROID rows are matched via the title index",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        normalized_droid_filename = droid_title(droidrow["NAME"])
+        normalized_lc_title = normalize_spaces(listcontroltitle)
         if normalized_droid_filename == normalized_lc_title:
             return True
         return False
 
-    def get_droid_value(
-        self, checksum, lc_title, lc_sub_series, rosetta_field, droid_field, path_mask
-    ):
-        """Retrieve a row from a DROID sheet."""
-        returnfield = ""
-        for drow in self.droidlist:
-            addtorow = False
-
-            checksumfromdroid = ""
-            if "MD5_HASH" in drow:
-                checksumfromdroid = drow["MD5_HASH"]
-            elif "SHA1_HASH" in drow:
-                checksumfromdroid = drow["SHA1_HASH"]
-            elif "SHA256_HASH" in drow:
-                checksumfromdroid = drow["SHA256_HASH"]
-            elif "SHA512_HASH" in drow:
-                checksumfromdroid = drow["SHA512_HASH"]
-            else:
-                logger.error("no hash available to use in DROID export.")
-                sys.exit(1)
-
-            if checksumfromdroid == checksum:
-                if not self.compare_filenames_as_titles(drow, lc_title):
-                    continue
-
-                # Performance, only do more work, if we have to care about it...
-                if checksumfromdroid not in self.duplicates:
-                    addtorow = True
-                else:
-                    addtorow = find_path_from_subseries(
-                        record_title=lc_title,
-                        droid_row=drow,
-                        lc_sub_series=lc_sub_series,
-                        series_mask=self.subseriesmask,
-                    )
-                    item_to_monitor = (
-                        f"{lc_sub_series}\\{lc_title} checksum: {checksumfromdroid}"
-                    )
-                    self.duplicateitemsaddedset.add(item_to_monitor)
+    def resolve_droid_row(self, checksum, lc_title, lc_sub_series):
+        """Resolve the DROID row matching a list control item.
 
-            if addtorow is True:
-                droidfield = drow[droid_field]
-                if rosetta_field == "File Original Path":
-                    returnfield = ingest_path_from_droid_row(
-                        droid_row=drow, path_mask=path_mask
-                    )
-                else:
-                    returnfield = droidfield
+        Returns None if no DROID row matches the item.
+        """
+        self.metrics.increment("droid lookups")
+        title = normalize_spaces(lc_title)
+        # Only rows sharing the checksum and title can match, the index
+        # keeps them in DROID order so the last match still wins.
+        droid_rows = self.droid.titleindex.get((checksum, title))
+        if not droid_rows:
+            return None
+        # Performance, only do more work, if we have to care about it...
+        if checksum in self.droid.duplicates:
+            return self._resolve_duplicate_droid_row(
+                checksum, title, lc_title, lc_sub_series
+            )
+        return droid_rows[-1]
+
+    def _resolve_duplicate_droid_row(self, checksum, title, lc_title, lc_sub_series):
+        """Resolve the DROID row matching a list control item whose
+        checksum is duplicated, via its sub-series.
+
+        Returns None if no DROID row matches the item.
+        """
+        if self.subseriesindex is None:
+            self._index_subseries_paths()
 
-        return returnfield
+        self.metrics.increment("duplicate resolutions")
+        item_to_monitor = f"{lc_sub_series}\\{lc_title} checksum: {checksum}"
+        self.duplicateitemsaddedset.add(item_to_monitor)
 
-    def csvstringoutput(self, csvlist):
-        """Output CSV as a string."""
+        droid_row = None
+        for drow in self.subseriesindex.get((lc_sub_series, title, checksum), []):
+            if lc_title.strip() not in drow["FILE_PATH"].strip():
+                logger.error("record title '%s' not in DROID filename", lc_title)
+                continue
+            droid_row = drow
+        return droid_row
 
-        csvrows = self.rosettacsvheader
-        sip_row = ['"",'] * len(self.rosettacsvdict)
-        sip_row[0] = '"SIP",'
-        sip_title = '"CSV Load",'
+    def _index_subseries_paths(self):
+        """Index DROID rows with duplicate checksums by sub-series path,
+        title and checksum so that a duplicate resolves in a single
+        lookup.
+        """
+        self.subseriesindex = {}
+        for (checksum, title), droid_rows in self.droid.titleindex.items():
+            if checksum not in self.droid.duplicates:
+                continue
+            for drow in droid_rows:
+                key = (subseries_path(drow, self.subseriesmask), title, checksum)
+                self.subseriesindex.setdefault(key, []).append(drow)
+
+    def _sip_row(self, title_suffix=""):
+        """Return the SIP row of the Rosetta CSV."""
+        sip_row = [""] * len(self.rosettacsvdict)
+        sip_row[0] = "SIP"
+        sip_title = "CSV Load"
         if self.config.has_option("rosetta mapping", "SIP Title"):
-            sip_title = f'"{self.config.get("rosetta mapping", "SIP Title")}",'
-        sip_row[1] = sip_title
-        sip_row = "".join(sip_row).rstrip(",")
-        csvrows = f"{csvrows}{sip_row}\n"
-        for sectionrows in csvlist:
-            rowdata = ""
-            for sectionrow in sectionrows:
-                for fielddata in sectionrow:
-                    rowdata = f"{rowdata}{fielddata},"
-                rowdata = f'{rowdata.rstrip(",")}\n'
-            csvrows = csvrows + rowdata
+            sip_title = self.config.get("rosetta mapping", "SIP Title")
+        sip_row[1] = self.add_csv_value(f"{sip_title}{title_suffix}")
+        return sip_row
+
+    def _csv_header_rows(self, title_suffix=""):
+        """Return the header and SIP rows of the Rosetta CSV."""
 
         # this is the best i can think of because ExLibris have named two fields
         # with the same title in CSV which doesn't help us when we're trying to
         # use unique names for populating rows replaces SIP Title with Title (DC)
-        csvrows = csvrows.replace(
-            '"Object Type","SIP Title"', '"Object Type","Title (DC)"'
-        )
+        header = [field["name"] for field in self.rosettacsvdict]
+        if header[:2] == ["Object Type", "SIP Title"]:
+            header[1] = "Title (DC)"
+        return csv_rows([header, self._sip_row(title_suffix)])
 
-        for dupe in self.duplicateitemsaddedset:
-            logger.info("duplicates to monitor: %s", dupe)
+    def _validate_rows(self, sectionrows, line):
+        """Validate rows against the constraints in the Rosetta schema.
+
+        `line` is the line number of the first row in the CSV.
+        """
+        for offset, sectionrow in enumerate(sectionrows):
+            errors = self.rosettavalidator.validate_row(sectionrow, line + offset)
+            for error_line, column, value, message in errors:
+                self.metrics.increment("validation errors")
+                count = self.metrics.counters["validation errors"]
+                if count <= MAX_LOGGED_VALIDATION_ERRORS:
+                    logger.warning(
+                        "line %s, column '%s' is invalid, %s: '%s'",
+                        error_line,
+                        column,
+                        message,
+                        value,
+                    )
+                if count == MAX_LOGGED_VALIDATION_ERRORS:
+                    logger.warning("further validation errors will only be counted")
 
-        return csvrows
+    def csv_item_rows(self, sectionrows):
+        """Return the IE, REPRESENTATION and FILE rows for a single list
+        control item as CSV.
+        """
+        return csv_rows(sectionrows)
 
-    def handleprovenanceexceptions(
-        self, provenance_field, sectionrow, field, csvindex, rnumber
-    ):
-        """Read a provenance CSV file for exceptions on specific rows."""
-        ignorefield = False
-        if not self.prov:
-            return False
-        for p_row in self.provlist:
-            if p_row["RECORDNUMBER"] != rnumber:
-                continue
-            if (provenance_field == "CHECKSUM" and field == self.provhash) or (
-                provenance_field == "ORIGINALNAME" and field == "File Original Name"
-            ):
-                if p_row[provenance_field].lower().strip() != "ignore":
-                    ignorefield = True
-                    sectionrow[csvindex] = self.add_csv_value(p_row[provenance_field])
-        return ignorefield
+    def write_header(self, output, title_suffix=""):
+        """Write the header and SIP rows of the Rosetta CSV, validating
+        the SIP row when asked to.
+
+        Returns the line number of the SIP row.
+        """
+        output.write(self._csv_header_rows(title_suffix))
+        # the header and SIP rows are lines one and two.
+        if self.validate:
+            with self.metrics.phase("validate"):
+                self._validate_rows([self._sip_row(title_suffix)], 2)
+        return 2
+
+    def write_item(self, output, itemrow, line, writer=None):
+        """Write the section rows of a list control item after line
+        `line`, validating them first when asked to.
+
+        With a pipeline writer the rows are handed to the writer's thread.
+        Returns the line number of the item's last row.
+        """
+        if self.validate:
+            with self.metrics.phase("validate"):
+                self._validate_rows(itemrow, line + 1)
+        if writer is not None:
+            writer.write(self.csv_item_rows(itemrow))
+        else:
+            with self.metrics.phase("write"):
+                output.write(self.csv_item_rows(itemrow))
+        return line + len(itemrow)
+
+    def log_summary(self):
+        """Log the duplicate items that were resolved via their
+        sub-series and, when validating, the validation errors found.
+        """
+        for dupe in self.duplicateitemsaddedset:
+            logger.info("duplicates to monitor: %s", dupe)
+        if self.validate:
+            logger.info(
+                "validation errors found: %s",
+                self.metrics.counters["validation errors"],
+            )
 
     def __setpathmask__(self):
         pathmask = ""
@@ -316,80 +470,93 @@ class RosettaCSVGenerator:
             pathmask = self.config.get("path values", "pathmask")
         return pathmask
 
-    def populaterows(self, field, listcontrolitem, sectionrow, csvindex, rnumber):
-        """Populate the rows in the Rosetta CSV."""
-
-        # populate cell with static values from config file
-        if self.config.has_option("static values", field):
-            rosettafield = self.config.get("static values", field)
-            sectionrow[csvindex] = self.add_csv_value(rosettafield)
-
+    def _field_resolver(self, field):
+        """Return the resolver used to populate a field in the Rosetta
+        CSV.
+        """
         # if there is a mapping configured to the list control, grab the value
         if self.config.has_option("rosetta mapping", field):
-            rosettafield = self.config.get("rosetta mapping", field)
-            addvalue = listcontrolitem[rosettafield]
-
+            access_values = None
             # ****MULTIPLE ACCESS RESTRICTIONS****#
             # If the field we've got in the config file is Access, we need to
             # Then grab the Rosetta access code for the correct restriction status
-            # Following a trail somewhat, but enables more flexible access restrictions in
-            if field == "Access Rights Policy ID (IE)":
-                if self.config.has_option("access values", addvalue):
-                    # addvalue becomes the specific code given to a specific restriction status...
-                    addvalue = self.config.get("access values", addvalue)
-
-            # place value into the cell within the row...
-            sectionrow[csvindex] = self.add_csv_value(addvalue)
+            if field == "Access Rights Policy ID (IE)" and self.config.has_section(
+                "access values"
+            ):
+                access_values = dict(self.config.items("access values"))
+            return ListControlValue(
+                self.config.get("rosetta mapping", field), access_values
+            )
 
         # if there is a mapping to a value in the droid export...
-        elif self.config.has_option("droid mapping", field):
-            rosettafield = self.config.get("droid mapping", field)
-            ignorefield = self.handleprovenanceexceptions(
-                "ORIGINALNAME", sectionrow, field, csvindex, rnumber
+        if self.config.has_option("droid mapping", field):
+            override_column = None
+            if self.prov is True and field == "File Original Name":
+                override_column = "ORIGINALNAME"
+            elif self.prov is True and field == self.provhash:
+                override_column = "CHECKSUM"
+            return DroidValue(
+                field,
+                self.config.get("droid mapping", field),
+                self.pathmask,
+                override_column,
+                self.provindex,
+                self.metrics,
             )
 
-            # if ignorefield is still false, check our checksum field as well...
-            if not ignorefield:
-                ignorefield = self.handleprovenanceexceptions(
-                    "CHECKSUM", sectionrow, field, csvindex, rnumber
-                )
-
-            if not ignorefield:
-                sectionrow[csvindex] = self.add_csv_value(
-                    self.get_droid_value(
-                        checksum=listcontrolitem["Missing Comment"],
-                        lc_title=listcontrolitem["Title"],
-                        lc_sub_series=listcontrolitem["Sub-Series"],
-                        rosetta_field=field,
-                        droid_field=rosettafield,
-                        path_mask=self.pathmask,
-                    )
-                )
-
-        elif self.prov is True:
-            for p in self.provlist:
-                if p["RECORDNUMBER"] == rnumber:
-                    if field == "Event Identifier Type":
-                        sectionrow[csvindex] = self.add_csv_value("EXTERNAL")
-                    if field == "Event Identifier Value":
-                        sectionrow[csvindex] = self.add_csv_value("EXT_1")
-                    if field == "Event Type":
-                        sectionrow[csvindex] = self.add_csv_value("CREATION")
-                    if field == "Event Description":
-                        sectionrow[csvindex] = self.add_csv_value("Provenance Note")
-                    if field == "Event Date":
-                        sectionrow[csvindex] = self.add_csv_value(p["NOTEDATE"])
-                    if field == "Event Outcome1":
-                        sectionrow[csvindex] = self.add_csv_value("SUCCESS")
-                    if field == "Event Outcome Detail1":
-                        sectionrow[csvindex] = self.add_csv_value(p["NOTETEXT"])
+        # populate cell with static values from config file
+        static_value = None
+        if self.config.has_option("static values", field):
+            static_value = self.config.get("static values", field)
 
-    def create_rosetta_csv(self):
-        """Primary loop to create the Rosetta CSV from the given list
-        control.
+        if self.prov is True and (
+            field in ProvenanceEventValue.event_values
+            or field in ProvenanceEventValue.event_columns
+        ):
+            return ProvenanceEventValue(field, self.provindex, static_value)
+
+        return StaticValue(static_value)
+
+    def _compile_plan(self):
+        """Compile the resolvers for each section of the Rosetta CSV.
+
+        Returns a list of (section, [(csvindex, resolver, record_number)])
+        tuples driven by the CFG file, e.g. IE, REPRESENTATION, FILE, then
+        each field in each of those. Fields are checked against the JSON
+        schema once, before any rows are created.
+        """
+        csvindex = 2
+        plan = []
+        for sections in self.rosettasections:
+            section_key = list(sections)[0]
+            resolvers = []
+            for field in sections[section_key]:
+                schema_field = None
+                if csvindex < len(self.rosettacsvdict):
+                    schema_field = self.rosettacsvdict[csvindex]["name"]
+                if field != schema_field:
+                    logger.error(
+                        "field in config: '%s' is not aligned with JSON schema '%s'",
+                        field,
+                        schema_field,
+                    )
+                    sys.exit(1)
+                # store for record level handling like provenance
+                record_number = field == "Archway Unique ID (Object Identifier)"
+                resolvers.append((csvindex, self._field_resolver(field), record_number))
+                # increment csvindex along the x-axis...
+                csvindex += 1
+            plan.append((section_key, resolvers))
+        return plan
+
+    def prepare_item_rows(self):
+        """Prepare to create the rows for list control items.
+
+        Returns the compiled plan and whether DROID rows need to be
+        resolved for it.
         """
         self.subseriesmask = ""
-        if self.duplicates:
+        if self.droid is not None and self.droid.duplicates:
             logger.info(
                 "duplicate checksums in list control, ensure '[path values] subseriesmask=' is set in config"
             )
@@ -397,104 +564,346 @@ class RosettaCSVGenerator:
                 self.subseriesmask = self.config.get("path values", "subseriesmask")
             else:
                 logger.info("subseries mask is not set in config")
+            with self.metrics.phase("sub-series index"):
+                self._index_subseries_paths()
+
+        plan = self._compile_plan()
+        resolve_droid = any(
+            isinstance(resolver, DroidValue)
+            for _, resolvers in plan
+            for _, resolver, _ in resolvers
+        )
+        return plan, resolve_droid
+
+    def join_item(self, item):
+        """Resolve the DROID row for a list control item."""
+        with self.metrics.phase("join"):
+            droid_row = self.resolve_droid_row(
+                checksum=item["Missing Comment"],
+                lc_title=item["Title"],
+                lc_sub_series=item["Sub-Series"],
+            )
+        if droid_row is None:
+            self.metrics.increment("unmatched items")
+            logger.warning(
+                "no DROID row matches list control item '%s' (checksum: '%s')",
+                item["Title"],
+                item["Missing Comment"],
+            )
+        return droid_row
 
-        csv_index_start = 2
-        csvindex = csv_index_start
-
-        self.rnumber = 0
-        fields = []
-
-        for item in self.exportlist:
-            itemrow = []
-
-            # self.rosettasections, list of dictionaries generated from CFG file...
-            for sections in self.rosettasections:
-                # sections, individual dictionaries from CFG file...
+    def render_item(self, plan, item, droid_row, rnumber):
+        """Create the section rows for a list control item.
 
+        Returns the section rows and the record number to carry on to
+        the next item.
+        """
+        itemrow = []
+        with self.metrics.phase("render"):
+            for section_key, resolvers in plan:
                 # section row is entire length of x-axis in spreadsheet from CSV JSON Config file...
-                sectionrow = ['""'] * len(self.rosettacsvdict)
-
-                section_key = list(sections)[0]
+                sectionrow = [""] * len(self.rosettacsvdict)
 
                 # Add key to the Y-axis of spreadsheet from dict...
                 sectionrow[0] = self.add_csv_value(section_key)
 
-                # driven by CFG file, not JSON, so field occurs in CFG file first...
-                # e.g. IE, REPRESENTATION, FILE, then each field in each of those...
-                for field in sections[section_key]:
+                for csvindex, resolver, record_number in resolvers:
                     # store for record level handling like provenance
-                    if field == "Archway Unique ID (Object Identifier)":
-                        self.rnumber = item["Item Code"]
-
-                    # if we have a matching field in the cfg, and json, populate it...
-                    if field == self.rosettacsvdict[csvindex]["name"]:
-                        self.populaterows(
-                            field, item, sectionrow, csvindex, self.rnumber
-                        )
-                    else:
-                        logger.error(
-                            "field in config: '%s' is not aligned with JSON schema '%s'",
-                            field,
-                            self.rosettacsvdict[csvindex]["name"],
-                        )
-                        sys.exit(1)
-
-                    # increment csvindex along the x-axis...
-                    csvindex += 1
+                    if record_number:
+                        rnumber = item["Item Code"]
+                    value = resolver(item, rnumber, droid_row)
+                    if value is not None:
+                        sectionrow[csvindex] = self.add_csv_value(value)
 
                 itemrow.append(sectionrow)
-            fields.append(itemrow)
-            csvindex = csv_index_start
-
-        return self.csvstringoutput(fields)
-
-    def listduplicates(self):
-        """List duplicates discovered running this script."""
-        seen = []
-        dupe = []
-        for row in self.droidlist:
-            cs = ""
-            if "MD5_HASH" in row:
-                cs = row["MD5_HASH"]
-            elif "SHA1_HASH" in row:
-                cs = row["SHA1_HASH"]
-            elif "SHA256_HASH" in row:
-                cs = row["SHA256_HASH"]
-            elif "SHA512_HASH" in row:
-                cs = row["SHA512_HASH"]
-            else:
-                logging.error("no hash available to use in DROID export")
-                sys.exit(1)
-            if cs not in seen:
-                seen.append(cs)
+        return itemrow, rnumber
+
+    def _rosetta_item_rows(self, start=0, rnumber=0):
+        """Primary loop to create the Rosetta CSV from the given list
+        control.
+
+        Yields the section rows for each list control item as soon as they
+        are created so that the sheet doesn't need to be held in memory.
+        Items before `start` are skipped, e.g. when resuming a run.
+        """
+        plan, resolve_droid = self.prepare_item_rows()
+
+        self.rnumber = rnumber
+
+        for item in itertools.islice(self.exportlist, start, None):
+            # resolve the DROID row once and share it across all FILE fields...
+            droid_row = self.join_item(item) if resolve_droid else None
+            itemrow, self.rnumber = self.render_item(
+                plan, item, droid_row, self.rnumber
+            )
+            yield itemrow
+
+    def write_rosetta_csv(self, output, checkpoint=None):
+        """Write the Rosetta CSV to a file-like object one list control
+        item at a time.
+
+        With a checkpoint, progress is committed as items are written and
+        a loaded checkpoint is resumed from its last commit.
+        """
+        state = checkpoint.state if checkpoint is not None else None
+        if state:
+            output.seek(state["offset"])
+            output.truncate()
+            start, line, rnumber = state["items"], state["line"], state["rnumber"]
+            for counter, count in state["counters"].items():
+                self.metrics.increment(counter, count)
+        else:
+            start, line, rnumber = 0, self.write_header(output), 0
+        if self.pipeline:
+            # rows are written by another thread as the next are created.
+            with PipelineWriter(output, self.metrics) as writer:
+                self._write_item_rows(output, checkpoint, start, line, rnumber, writer)
+        else:
+            self._write_item_rows(output, checkpoint, start, line, rnumber)
+        if checkpoint is not None:
+            checkpoint.complete()
+        self.log_summary()
+
+    def _write_item_rows(self, output, checkpoint, start, line, rnumber, writer=None):
+        """Write the rows for list control items from `start` onwards.
+
+        With a pipeline writer, rows and checkpoint commits are handed to
+        the writer's thread which does them in order.
+        """
+        items = start
+        for itemrow in self._rosetta_item_rows(start, rnumber):
+            line = self.write_item(output, itemrow, line, writer)
+            items += 1
+            if checkpoint is None or items % checkpoint.interval:
+                continue
+            progress = {
+                "items": items,
+                "line": line,
+                "rnumber": self.rnumber,
+                "counters": dict(self.metrics.counters),
+            }
+            if writer is not None:
+                writer.submit(checkpoint.commit, output, progress)
             else:
-                dupe.append(cs)
-        return set(dupe)
+                with self.metrics.phase("checkpoint"):
+                    checkpoint.commit(output, progress)
+
+    def create_rosetta_csv(self):
+        """Create the Rosetta CSV from the given list control and return
+        it as a string.
+        """
+        output = io.StringIO()
+        self.write_rosetta_csv(output)
+        return output.getvalue()
+
+    def _droid_hash_priority(self):
+        """Return the DROID hash columns in order of preference."""
+        if self.config.has_option("application configuration", "droidhashes"):
+            priority = self.config.get("application configuration", "droidhashes")
+            return tuple(
+                column.strip() for column in priority.split(",") if column.strip()
+            )
+        return HASH_COLUMNS
+
+    def _export_columns(self):
+        """Return the list control columns needed to create the Rosetta
+        CSV.
+        """
+        columns = {"Item Code", "Missing Comment", "Title", "Sub-Series"}
+        if self.config.has_section("rosetta mapping"):
+            columns.update(value for _, value in self.config.items("rosetta mapping"))
+        return columns
+
+    def _droid_columns(self, hashcolumn=None):
+        """Return the DROID columns needed to create the Rosetta CSV."""
+        return {"URI", "TYPE", *self._droid_row_columns(hashcolumn)}
+
+    def _droid_row_columns(self, hashcolumn=None):
+        """Return the DROID columns kept for each row once folders and
+        container contents are filtered out.
+
+        Every hash column that might be used is kept until the hash column
+        is known.
+        """
+        hash_columns = (hashcolumn,) if hashcolumn else self._droid_hash_priority()
+        columns = {"NAME", "FILE_PATH", *hash_columns}
+        if self.sharder is not None and self.sharder.max_bytes:
+            columns.add("SIZE")
+        if self.config.has_section("droid mapping"):
+            columns.update(value for _, value in self.config.items("droid mapping"))
+        return columns
 
     def read_export_csv(self):
         """Read a list control CSV."""
         if self.exportsheet is not False:
             csvhandler = GenericCSVHandler()
-            exportlist = csvhandler.csv_as_list(self.exportsheet)
-            return exportlist
-
-    def read_droid_csv(self):
-        """Read a DROID CSV."""
-        if self.droidcsv is not False:
-            droidcsvhandler = DroidCSVHandler()
-            droidlist = droidcsvhandler.read_droid_csv(self.droidcsv)
-            droidlist = droidcsvhandler.remove_folders(droidlist)
-            return droidcsvhandler.remove_container_contents(droidlist)
-
-    def export_to_rosetta_csv(self):
-        """Convert a list control and droid sheet to a Rosetta CSV."""
-        if self.droidcsv is not False and self.exportsheet is not False:
-            self.droidlist = self.read_droid_csv()
+            return csvhandler.csv_as_list(self.exportsheet, self._export_columns())
+
+    def _droid_csvs(self):
+        """Return the DROID CSVs to read, expanding any glob patterns once."""
+        if self.droidcsvs is None:
+            self.droidcsvs = expand_droid_csvs(self.droidcsv)
+        return self.droidcsvs
+
+    def _read_droid_csv(self, hashcolumn):
+        """Read the DROID CSVs concurrently, filtering folders and
+        container contents as they are read.
+
+        Returns the filtered rows of each DROID CSV.
+        """
+        droidcsvhandler = DroidCSVHandler()
+        return droidcsvhandler.read_droid_csvs(
+            self.droidcsvs,
+            self._droid_columns(hashcolumn),
+            self._droid_row_columns(hashcolumn),
+        )
+
+    def _read_droid_index(self):
+        """Read, filter, merge and index the DROID exports, or load them
+        from the DROID index cache if a valid cache entry exists.
+        """
+        droidcsvs = self._droid_csvs()
+        # the hash column decides which columns are read and cached.
+        hashcolumn = select_hash_column(droidcsvs, self._droid_hash_priority())
+        columns = self._droid_columns(hashcolumn)
+        cache = None
+        if self.cachedir:
+            cache = DroidIndexCache(self.cachedir)
+            with self.metrics.phase("droid cache load"):
+                droid = cache.load(droidcsvs, columns)
+            if droid is not None:
+                return droid
+
+        # folders and container contents are filtered as DROID is read.
+        with self.metrics.phase("droid read and filter"):
+            droidlists = self._read_droid_csv(hashcolumn)
+        with self.metrics.phase("droid index"):
+            droid = DroidIndex.merge(droidcsvs, hashcolumn, droidlists)
+        with self.metrics.phase("duplicate detection"):
+            droid.index_duplicates()
+
+        if cache is not None:
+            with self.metrics.phase("droid cache save"):
+                cache.save(droid, columns)
+        return droid
+
+    def _read_indexed_droid(self):
+        """Read and index the DROID exports, titles included, for the
+        in-memory cache.
+        """
+        droid = self._read_droid_index()
+        with self.metrics.phase("title index"):
+            droid.index_titles()
+        return droid
+
+    def read_droid_index(self):
+        """Read and index the DROID exports once, taking them from the
+        in-memory cache if they haven't changed since they were last read.
+
+        Returns the DroidIndex.
+        """
+        if self.droid is not None:
+            return self.droid
+        if self.memcache is None:
+            self.droid = self._read_droid_index()
+            return self.droid
+        key = (
+            file_fingerprint(self._droid_csvs()),
+            tuple(sorted(self._droid_columns())),
+            self._droid_hash_priority(),
+        )
+        self.droid = self.memcache.droid_indexes.get(key)
+        if self.droid is None:
+            self.droid = self._read_indexed_droid()
+            self.memcache.droid_indexes.put(key, self.droid)
+        else:
+            logger.info("using DROID index held in memory")
+        return self.droid
+
+    def _read_droid_sources(self):
+        """Read the DROID exports and index their titles."""
+        droid = self.read_droid_index()
+        if droid.titleindex is None:
+            # e.g. only read to verify fixity so far.
+            with self.metrics.phase("title index"):
+                droid.index_titles()
+
+    def _read_list_control(self):
+        """Read the list control."""
+        with self.metrics.phase("list control read"):
             self.exportlist = self.read_export_csv()
-            if self.prov is True:
-                provhandler = ProvenanceCSVHandler()
-                self.provlist = provhandler.read_provenance_csv(self.provfile)
-                if self.provlist is None:
-                    self.prov = False
-            self.duplicates = self.listduplicates()
+
+    def _read_provenance(self):
+        """Read and index the provenance notes."""
+        if self.prov is not True:
+            return
+        with self.metrics.phase("provenance read"):
+            provhandler = ProvenanceCSVHandler()
+            self.provlist = provhandler.read_provenance_csv(self.provfile)
+            if self.provlist is None:
+                self.prov = False
+            self.provindex = provhandler.index_provenance(self.provlist)
+
+    def _read_concurrently(self, readers):
+        """Run the readers of the inputs, at the same time when pipelined
+        so that one can be read while another is indexed.
+        """
+        if not self.pipeline:
+            for reader in readers:
+                reader()
+            return
+        with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+            futures = [executor.submit(reader) for reader in readers]
+            # raise the first error, in order...
+            for future in futures:
+                future.result()
+
+    def read_sources(self):
+        """Read the DROID exports, list control and provenance notes."""
+        self._read_concurrently(
+            [self._read_droid_sources, self._read_list_control, self._read_provenance]
+        )
+        if self.duplicatesreport:
+            self.droid.write_duplicates_report(self.duplicatesreport)
+
+    def checkpoint_inputs(self):
+        """Return the input files a checkpoint depends on."""
+        inputs = [
+            *self._droid_csvs(),
+            self.exportsheet,
+            self.rosettaschema,
+            self.configfile,
+        ]
+        if self.prov is True:
+            inputs.append(self.provfile)
+        return inputs
+
+    def export_to_rosetta_csv_file(self, outputfile):
+        """Convert a list control and droid sheet to a Rosetta CSV file.
+
+        If a checkpoint directory is configured the run can be resumed
+        from its last commit if it is interrupted.
+        """
+        checkpoint = None
+        mode = "w"
+        if self.checkpointdir:
+            checkpoint = GeneratorCheckpoint(
+                self.checkpointdir, outputfile, self.checkpoint_inputs()
+            )
+            if checkpoint.load():
+                mode = "r+"
+        with open(outputfile, mode, encoding="utf-8", newline="") as output:
+            self.export_to_rosetta_csv(output=output, checkpoint=checkpoint)
+
+    def export_to_rosetta_csv(self, output=None, checkpoint=None):
+        """Convert a list control and droid sheet to a Rosetta CSV.
+
+        If `output` is a file-like object the CSV is streamed to it as it
+        is generated, otherwise the CSV is returned as a string.
+        """
+        if self.droidcsv is not False and self.exportsheet is not False:
+            self.read_sources()
+            if output is not None:
+                self.write_rosetta_csv(output, checkpoint)
+                return None
             return self.create_rosetta_csv()
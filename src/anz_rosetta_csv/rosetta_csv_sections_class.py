@@ -1,9 +1,10 @@
 """Rosetta CSV sections handler."""
 
-import configparser as ConfigParser
 import logging
 import sys
 
+from .rosetta_config_class import RosettaConfig
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,10 +14,11 @@ class RosettaCSVSections:
     sections = None
     config = None
 
-    def __init__(self, configfile):
-        logging.info("reading app config from '%s'", configfile)
-        self.config = ConfigParser.RawConfigParser()
-        self.config.read(configfile, encoding="utf-8")
+    def __init__(self, config):
+        # share the parsed config with the generator where it's given.
+        if not isinstance(config, RosettaConfig):
+            config = RosettaConfig.load(config)
+        self.config = config
 
         # Configure via CFG to avoid users having to edit code
         sections = []
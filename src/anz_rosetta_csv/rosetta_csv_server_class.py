@@ -0,0 +1,409 @@
+"""Rosetta CSV job server.
+
+Runs the generator as a long-running local service so that callers, e.g.
+a web front end, don't pay for process start-up, config and schema
+parsing and DROID loading on every request. Jobs are queued and run by a
+bounded pool of workers. A job whose caller goes away while it is queued
+is cancelled before a worker starts it. Parsed schemas, Rosetta CSV
+sections and DROID indexes are kept warm in memory between jobs. Each
+Rosetta CSV is streamed back to the caller as it is generated.
+
+The server listens on a TCP address, e.g. `127.0.0.1:8080`, or a Unix
+socket, e.g. `unix:/run/anz_rosetta_csv.sock`. It reads the files named
+in each job from local disk and is only meant for local callers.
+
+    POST /jobs    run a job. The body is a JSON object of generator
+                  arguments, the response is the Rosetta CSV.
+    GET /status   queue, worker and cache stats as JSON.
+"""
+
+import http.client
+import itertools
+import json
+import logging
+import os
+import queue
+import select
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .generator_cache_class import GeneratorCache
+from .rosetta_csv_generator import RosettaCSVGenerator
+
+logger = logging.getLogger(__name__)
+
+# Jobs run at the same time.
+JOB_WORKERS = 2
+
+# Jobs waiting for a worker before new jobs are turned away.
+JOB_QUEUE_SIZE = 16
+
+# Characters of the Rosetta CSV sent to the caller at a time.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Chunks waiting to be sent before the job waits for the caller.
+STREAM_QUEUE_SIZE = 16
+
+# Seconds to wait on a caller before checking the job is still wanted.
+STREAM_POLL_INTERVAL = 0.1
+
+# Job arguments passed to the generator, and whether they're required.
+JOB_ARGUMENTS = {
+    "droidcsv": True,
+    "exportsheet": True,
+    "rosettaschema": True,
+    "configfile": True,
+    "provenance": False,
+    "validate": False,
+    "pipeline": False,
+}
+
+
+class JobCancelled(Exception):
+    """The caller of a job has gone away."""
+
+
+def parse_address(address):
+    """Return the socket family and address to listen on for a
+    `host:port`, `port` or `unix:path` address.
+    """
+    address = str(address)
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def job_arguments(body):
+    """Return the generator arguments for a job from its JSON body.
+
+    Raises ValueError if the body isn't a valid job.
+    """
+    params = json.loads(body)
+    if not isinstance(params, dict):
+        raise ValueError("a job must be a JSON object")
+    unknown = sorted(set(params) - set(JOB_ARGUMENTS))
+    if unknown:
+        raise ValueError(f"unknown job arguments: {', '.join(unknown)}")
+    missing = [
+        argument
+        for argument, required in JOB_ARGUMENTS.items()
+        if required and not params.get(argument)
+    ]
+    if missing:
+        raise ValueError(f"missing job arguments: {', '.join(missing)}")
+    return params
+
+
+class Job:
+    """A single Rosetta CSV to generate and stream to its caller."""
+
+    job_ids = itertools.count(1)
+
+    def __init__(self, params):
+        self.job_id = next(self.job_ids)
+        self.params = params
+        self.messages = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.cancelled = threading.Event()
+
+    def put(self, kind, value=None):
+        """Pass a message to the caller, waiting while the caller is
+        behind.
+        """
+        while True:
+            if self.cancelled.is_set():
+                raise JobCancelled(self.job_id)
+            try:
+                self.messages.put((kind, value), timeout=STREAM_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, timeout=None):
+        """Return the next (kind, value) message for the caller.
+
+        Raises queue.Empty if there isn't one within `timeout` seconds.
+        """
+        return self.messages.get(timeout=timeout)
+
+    def cancel(self):
+        """Stop the job, e.g. when its caller has gone away."""
+        self.cancelled.set()
+
+
+class JobOutput:
+    """File-like output that streams a job's Rosetta CSV in chunks."""
+
+    def __init__(self, job):
+        self.job = job
+        self.buffer = []
+        self.size = 0
+
+    def write(self, text):
+        """Write text to the caller."""
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= STREAM_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Send buffered text to the caller."""
+        if self.buffer:
+            self.job.put("data", "".join(self.buffer))
+            self.buffer = []
+            self.size = 0
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    """HTTP server on a Unix socket, a thread per connection."""
+
+    daemon_threads = True
+
+
+class RosettaCSVRequestHandler(BaseHTTPRequestHandler):
+    """Rosetta CSV job server request handler."""
+
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def send_json(self, status, body):
+        """Send a complete JSON response."""
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def caller_connected(self):
+        """Return False if the caller has closed its connection."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            # a closed connection is readable with nothing left to read.
+            return not readable or bool(self.connection.recv(1, socket.MSG_PEEK))
+        except OSError:
+            return False
+
+    def drop_connection(self):
+        """Close the connection once the request is handled, without
+        ending its response.
+        """
+        # the base handler resets its close_connection flag per request.
+        self.close_connection = True  # pylint: disable=W0201
+
+    def wait_for_job(self, job):
+        """Return the first message of a job, checking the caller is still
+        connected while the job waits for a worker.
+
+        Raises ConnectionError if the caller has gone away, so the job is
+        cancelled before a worker starts it.
+        """
+        while True:
+            try:
+                return job.get(timeout=STREAM_POLL_INTERVAL)
+            except queue.Empty as err:
+                if not self.caller_connected():
+                    raise ConnectionAbortedError("closed while queued") from err
+
+    def send_chunk(self, text):
+        """Send a chunk of a chunked response."""
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Report the status of the server."""
+        if self.path != "/status":
+            self.send_json(404, {"error": f"not found: {self.path}"})
+            return
+        self.send_json(200, self.server.rosetta.stats())
+
+    def do_POST(self):  # pylint: disable=C0103
+        """Run a job and stream its Rosetta CSV back."""
+        if self.path != "/jobs":
+            self.send_json(404, {"error": f"not found: {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            params = job_arguments(self.rfile.read(length))
+        except ValueError as err:
+            self.send_json(400, {"error": str(err)})
+            return
+        job = Job(params)
+        if not self.server.rosetta.submit(job):
+            self.send_json(503, {"error": "the job queue is full, try again later"})
+            return
+        try:
+            self.stream_job(job)
+        except OSError as err:
+            logger.warning("job %s caller went away: %s", job.job_id, err)
+            job.cancel()
+            self.drop_connection()
+
+    def stream_job(self, job):
+        """Stream the messages of a job to its caller."""
+        kind, value = self.wait_for_job(job)
+        if kind == "error":
+            self.send_json(422, {"error": value})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Job-Id", str(job.job_id))
+        self.end_headers()
+        while kind == "data":
+            self.send_chunk(value)
+            kind, value = job.get()
+        if kind == "error":
+            # the CSV is incomplete, close without ending the chunked
+            # response so the caller can't mistake it for a whole CSV.
+            logger.error("job %s failed while streaming: %s", job.job_id, value)
+            self.drop_connection()
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class RosettaCSVServer:
+    """Rosetta CSV job server class."""
+
+    def __init__(
+        self, address, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE, memcache=None
+    ):
+        self.memcache = memcache if memcache is not None else GeneratorCache()
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.counters = {"running": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        family, bind_address = parse_address(address)
+        self.family = family
+        if family == socket.AF_UNIX:
+            self.httpd = ThreadingUnixHTTPServer(bind_address, RosettaCSVRequestHandler)
+        else:
+            self.httpd = ThreadingHTTPServer(bind_address, RosettaCSVRequestHandler)
+        self.httpd.rosetta = self
+        self.workers = [
+            threading.Thread(
+                target=self._work, name=f"rosetta-csv-worker-{idx}", daemon=True
+            )
+            for idx in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def address(self):
+        """Return the address the server is listening on."""
+        return self.httpd.server_address
+
+    def _count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self._count("running")
+            try:
+                self.run_job(job)
+            finally:
+                self._count("running", -1)
+
+    def submit(self, job):
+        """Queue a job, returns False if the queue is full."""
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            return False
+        logger.info("job %s queued: %s", job.job_id, job.params)
+        return True
+
+    def run_job(self, job):
+        """Generate the Rosetta CSV for a job."""
+        if job.cancelled.is_set():
+            self._count("cancelled")
+            return
+        start = time.perf_counter()
+        output = JobOutput(job)
+        try:
+            csvgen = RosettaCSVGenerator(**job.params, memcache=self.memcache)
+            csvgen.export_to_rosetta_csv(output=output)
+            output.flush()
+            job.put("done")
+        except JobCancelled:
+            self._count("cancelled")
+            logger.warning("job %s cancelled", job.job_id)
+            return
+        except SystemExit:
+            # the generator has logged why it can't continue.
+            self._fail(job, "the job failed, see the server log for details")
+            return
+        except Exception as err:  # pylint: disable=W0718
+            logger.exception("job %s failed", job.job_id)
+            self._fail(job, str(err))
+            return
+        self._count("completed")
+        logger.info(
+            "job %s completed in %.3fs", job.job_id, time.perf_counter() - start
+        )
+
+    def _fail(self, job, message):
+        self._count("failed")
+        try:
+            job.put("error", message)
+        except JobCancelled:
+            pass
+
+    def stats(self):
+        """Return the status of the queue, workers and caches."""
+        with self.lock:
+            counters = dict(self.counters)
+        return {
+            "workers": len(self.workers),
+            "queued": self.jobs.qsize(),
+            "jobs": counters,
+            "caches": self.memcache.stats(),
+        }
+
+    def serve_forever(self):
+        """Handle requests until the server is shut down."""
+        logger.info("serving Rosetta CSV jobs on: %s", self.address)
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop handling requests and stop the workers once the jobs
+        already running are complete.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.family == socket.AF_UNIX:
+            os.unlink(self.address)
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to a server on a Unix socket, for local callers."""
+
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
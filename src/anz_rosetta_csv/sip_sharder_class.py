@@ -0,0 +1,170 @@
+"""SIP sharding.
+
+Rosetta ingests very large SIPs slowly and unreliably. IEs are packed
+into several smaller SIPs under limits on the number of files, IEs and
+total bytes in each. The files of an IE are never split across SIPs.
+
+Shards are written by a pool of threads. That overlaps writing one
+shard's file with rendering another's rows, which helps on slow shares,
+but rendering is pure Python and holds the GIL so it isn't spread across
+CPUs: a CPU-bound run writes its shards no faster than one at a time.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# SIP shards written at the same time.
+SHARD_WRITE_WORKERS = 4
+
+
+def droid_row_size(droid_row: dict) -> int:
+    """Return the size in bytes of the file in a DROID row, zero if it
+    isn't known.
+    """
+    if droid_row is None:
+        return 0
+    try:
+        return int(droid_row.get("SIZE") or 0)
+    except ValueError:
+        return 0
+
+
+class SIPSharder:
+    """SIP sharding class."""
+
+    def __init__(self, max_files=None, max_ies=None, max_bytes=None):
+        self.max_files = max_files
+        self.max_ies = max_ies
+        self.max_bytes = max_bytes
+
+    def fits(self, shard, files, size):
+        """Return True if an IE fits in a shard without exceeding any
+        limit.
+        """
+        if self.max_ies and shard["ies"] + 1 > self.max_ies:
+            return False
+        if self.max_files and shard["files"] + files > self.max_files:
+            return False
+        if self.max_bytes and shard["bytes"] + size > self.max_bytes:
+            return False
+        return True
+
+    def pack(self, ies):
+        """Pack IEs into shards.
+
+        `ies` is a list of (index, files, size) tuples, the index being
+        the position of the IE in the list control. With a byte limit IEs
+        are packed first-fit decreasing by size so that each shard is as
+        full as it can be, otherwise shards are filled in order.
+
+        Returns a list of shards, each a list of IE indexes in list
+        control order.
+        """
+        order = ies
+        if self.max_bytes:
+            order = sorted(ies, key=lambda ie: ie[2], reverse=True)
+        fewest = min((files for _, files, _ in ies), default=0)
+        smallest = min((size for _, _, size in ies), default=0)
+        shards = []
+        # shards that may still fit another IE.
+        open_shards = []
+        for ie, files, size in order:
+            if self.max_bytes and size > self.max_bytes:
+                logger.warning(
+                    "IE '%s' is larger than the SIP byte limit: %s bytes", ie, size
+                )
+            for shard in open_shards:
+                if self.fits(shard, files, size):
+                    break
+            else:
+                shard = {"ies": 0, "files": 0, "bytes": 0, "items": []}
+                shards.append(shard)
+                if not self.max_bytes:
+                    # shards are filled in order, only the last is open.
+                    open_shards.clear()
+                open_shards.append(shard)
+            shard["ies"] += 1
+            shard["files"] += files
+            shard["bytes"] += size
+            shard["items"].append(ie)
+            if not self.fits(shard, fewest, smallest):
+                open_shards.remove(shard)
+        return [sorted(shard["items"]) for shard in shards]
+
+
+class SIPShardWriter:
+    """SIP shard writer class.
+
+    Writes the Rosetta CSV of a generator as several SIPs, one file per
+    shard, each with its own SIP row with the shard number added to its
+    title.
+    """
+
+    def __init__(self, csvgen, sharder=None):
+        self.csvgen = csvgen
+        self.sharder = sharder or csvgen.sharder
+        self.plan = None
+        self.droid_rows = []
+        self.shards = []
+
+    def pack(self):
+        """Resolve the DROID row of every list control item and pack the
+        items into shards, the size of each IE is needed to pack them.
+
+        Returns the shards.
+        """
+        csvgen = self.csvgen
+        self.plan, resolve_droid = csvgen.prepare_item_rows()
+        files_per_ie = sum(1 for section_key, _ in self.plan if section_key == "FILE")
+        self.droid_rows = []
+        ies = []
+        for index, item in enumerate(csvgen.exportlist):
+            droid_row = csvgen.join_item(item) if resolve_droid else None
+            self.droid_rows.append(droid_row)
+            ies.append((index, files_per_ie, droid_row_size(droid_row)))
+        with csvgen.metrics.phase("shard plan"):
+            self.shards = self.sharder.pack(ies)
+        return self.shards
+
+    def write_shard(self, number, shardfile):
+        """Write a shard, numbered from one, to its own file."""
+        csvgen = self.csvgen
+        title_suffix = f" ({number} of {len(self.shards)})"
+        with open(shardfile, "w", encoding="utf-8", newline="") as output:
+            line = csvgen.write_header(output, title_suffix)
+            rnumber = 0
+            for index in self.shards[number - 1]:
+                itemrow, rnumber = csvgen.render_item(
+                    self.plan, csvgen.exportlist[index], self.droid_rows[index], rnumber
+                )
+                line = csvgen.write_item(output, itemrow, line)
+
+    def write(self, outputdir):
+        """Convert a list control and droid sheet to several Rosetta CSVs,
+        one for each SIP shard, written concurrently.
+
+        Returns the files written.
+        """
+        csvgen = self.csvgen
+        if csvgen.droidcsv is False or csvgen.exportsheet is False:
+            return []
+        csvgen.read_sources()
+        self.pack()
+
+        outputdir = Path(outputdir)
+        outputdir.mkdir(parents=True, exist_ok=True)
+        width = max(3, len(str(len(self.shards))))
+        shardfiles = [
+            outputdir / f"sip-{number:0{width}d}.csv"
+            for number in range(1, len(self.shards) + 1)
+        ]
+        logger.info("writing %s SIP shards to: '%s'", len(self.shards), outputdir)
+        workers = min(len(self.shards), SHARD_WRITE_WORKERS) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            numbers = range(1, len(shardfiles) + 1)
+            list(executor.map(self.write_shard, numbers, shardfiles))
+        csvgen.log_summary()
+        return shardfiles
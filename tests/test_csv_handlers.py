@@ -0,0 +1,141 @@
+"""CSV handler tests."""
+
+from pathlib import Path
+
+from src.anz_rosetta_csv.droid_csv_handler_class import (
+    DroidCSVHandler,
+    GenericCSVHandler,
+)
+from src.anz_rosetta_csv.droid_row_class import DroidRow
+from src.anz_rosetta_csv.provenance_csv_handler_class import ProvenanceCSVHandler
+
+
+def test_iter_rows_projection(tmp_path):
+    """Ensure rows can be projected onto a subset of columns."""
+
+    csv_file = tmp_path / "droid.csv"
+    csv_file.write_text(
+        "ID,NAME,TYPE,MD5_HASH\n1,file.doc,File,abc\n2,folder,Folder,\n",
+        encoding="utf-8",
+    )
+
+    csvhandler = GenericCSVHandler()
+    rows = list(csvhandler.iter_rows(csv_file, {"NAME", "MD5_HASH", "SHA1_HASH"}))
+    assert rows == [
+        {"NAME": "file.doc", "MD5_HASH": "abc"},
+        {"NAME": "folder", "MD5_HASH": ""},
+    ]
+    assert csvhandler.csv_as_list(csv_file)[0] == {
+        "ID": "1",
+        "NAME": "file.doc",
+        "TYPE": "File",
+        "MD5_HASH": "abc",
+    }
+    assert csvhandler.csv_as_list(tmp_path / "missing.csv") is None
+
+
+def test_index_provenance(tmp_path):
+    """Ensure provenance notes are indexed by record number."""
+
+    prov_file = tmp_path / "prov.notes"
+    prov_file.write_text(
+        "RECORDNUMBER,NOTEDATE,NOTETEXT,ORIGINALNAME,CHECKSUM\n"
+        "R1,2017-10-27 12:51:00,first,Ignore,Ignore\n"
+        "R2,2017-10-27 12:52:00,other,Ignore,Ignore\n"
+        "R1,2017-10-27 12:53:00,second,Ignore,Ignore\n",
+        encoding="utf-8",
+    )
+
+    provhandler = ProvenanceCSVHandler()
+    provindex = provhandler.index_provenance(provhandler.read_provenance_csv(prov_file))
+    assert [note["NOTETEXT"] for note in provindex["R1"]] == ["first", "second"]
+    assert [note["NOTETEXT"] for note in provindex["R2"]] == ["other"]
+    assert not provhandler.index_provenance(None)
+
+
+def test_expand_droid_paths(tmp_path):
+    """Ensure DROID CSV names and glob patterns are expanded in order
+    without repeating a file.
+    """
+
+    for name in ("run-2.csv", "run-1.csv", "other.csv"):
+        (tmp_path / name).write_text("ID,NAME\n", encoding="utf-8")
+
+    droidhandler = DroidCSVHandler()
+    files, unmatched = droidhandler.expand_droid_paths(
+        [
+            str(tmp_path / "other.csv"),
+            str(tmp_path / "run-*.csv"),
+            str(tmp_path / "run-1.csv"),
+            str(tmp_path / "missing-*.csv"),
+        ]
+    )
+    assert [Path(fname).name for fname in files] == [
+        "other.csv",
+        "run-1.csv",
+        "run-2.csv",
+    ]
+    assert unmatched == [str(tmp_path / "missing-*.csv")]
+
+
+def test_read_filtered_droid_csv(tmp_path):
+    """Ensure folders and container contents are filtered from a DROID
+    CSV and rows only keep the columns asked for.
+    """
+
+    csv_file = tmp_path / "droid.csv"
+    csv_file.write_text(
+        "ID,URI,NAME,TYPE,MD5_HASH\n"
+        "1,file:/folder/,folder,Folder,\n"
+        "2,file:/folder/file.zip,file.zip,File,abc\n"
+        "3,zip:file:/folder/file.zip!/file.doc,file.doc,File,def\n",
+        encoding="utf-8",
+    )
+
+    droidhandler = DroidCSVHandler()
+    rows = droidhandler.read_filtered_droid_csv(
+        csv_file, {"URI", "NAME", "TYPE", "MD5_HASH"}, {"NAME", "MD5_HASH"}
+    )
+    assert len(rows) == 1
+    assert rows[0] == {"NAME": "file.zip", "MD5_HASH": "abc"}
+    assert rows[0]["MD5_HASH"] == "abc"
+    assert "URI" not in rows[0]
+    assert rows[0].get("URI") is None
+
+
+def test_droid_header_and_file_uris(tmp_path):
+    """Ensure the header of a DROID CSV can be read on its own and file
+    URIs are told apart from container contents.
+    """
+
+    csv_file = tmp_path / "droid.csv"
+    csv_file.write_text(
+        "ID,URI,NAME,TYPE,SHA1_HASH\n1,file:/folder/file.doc,file.doc,File,abc\n",
+        encoding="utf-8",
+    )
+
+    droidhandler = DroidCSVHandler()
+    assert droidhandler.read_droid_header(csv_file) == [
+        "ID",
+        "URI",
+        "NAME",
+        "TYPE",
+        "SHA1_HASH",
+    ]
+    assert droidhandler.is_file_uri("file:/folder/file.doc")
+    assert droidhandler.is_file_uri("FILE:/folder/file.doc")
+    assert not droidhandler.is_file_uri("zip:file:/folder/file.zip!/file.doc")
+    assert not droidhandler.is_file_uri("")
+
+
+def test_droid_row_mapping():
+    """Ensure a DROID row gives the same views as the equivalent dict."""
+
+    row = DroidRow(DroidRow.column_index(["NAME", "MD5_HASH"]), ("file.doc", "abc"))
+    expected = {"NAME": "file.doc", "MD5_HASH": "abc"}
+    assert list(row.keys()) == list(expected.keys())
+    assert list(row.values()) == list(expected.values())
+    assert list(row.items()) == list(expected.items())
+    assert dict(row) == expected
+    assert "NAME" in row
+    assert "URI" not in row
@@ -0,0 +1,282 @@
+"""DROID index tests."""
+
+import io
+import os
+
+import pytest
+
+from src.anz_rosetta_csv.droid_index_cache_class import DroidIndexCache
+from src.anz_rosetta_csv.droid_index_class import DroidIndex
+from src.anz_rosetta_csv.droid_row_class import DroidRow
+from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+
+from .test_import_generator import (
+    dupe_config,
+    dupe_droid_csv,
+    dupe_list_control,
+    dupe_result,
+    schema,
+)
+
+
+def write_droid_rows(droid_report, rows):
+    """Write a minimal DROID export of (NAME, FILE_PATH, MD5_HASH) files."""
+    lines = ["URI,TYPE,NAME,FILE_PATH,MD5_HASH"] + [
+        f"file:/{name},File,{name},{path},{checksum}" for name, path, checksum in rows
+    ]
+    droid_report.write_text("\n".join(lines), encoding="utf-8")
+
+
+def test_resolve_droid_row(tmp_path, mocker):
+    """Ensure a list control item resolves to the DROID row with its
+    checksum and title.
+    """
+
+    droid_report = tmp_path / "droid.csv"
+    write_droid_rows(
+        droid_report,
+        [
+            ("letter.doc", "a\\letter.doc", "abc"),
+            ("memo.doc", "b\\memo.doc", "def"),
+        ],
+    )
+    mocker.patch.object(RosettaCSVGenerator, "read_rosetta_schema")
+    csvgen = RosettaCSVGenerator(droid_report, False, False, io.StringIO(""))
+    csvgen.read_sources()
+
+    assert csvgen.droid.hashcolumn == "MD5_HASH"
+    assert not csvgen.droid.duplicates
+    assert csvgen.resolve_droid_row("abc", "letter", "")["FILE_PATH"] == "a\\letter.doc"
+    assert csvgen.resolve_droid_row("def", "memo", "")["FILE_PATH"] == "b\\memo.doc"
+    assert csvgen.resolve_droid_row("abc", "report", "") is None
+    assert csvgen.resolve_droid_row("def", "letter", "") is None
+
+
+def test_resolve_duplicate_droid_row(tmp_path, mocker):
+    """Ensure DROID rows with duplicate checksums are resolved via their
+    sub-series.
+    """
+
+    droid_report = tmp_path / "droid.csv"
+    write_droid_rows(
+        droid_report,
+        [
+            ("letter.doc", "T\\a\\letter.doc", "abc"),
+            ("letter.doc", "T\\b\\letter.doc", "abc"),
+            ("memo.doc", "T\\b\\memo.doc", "abc"),
+        ],
+    )
+    mocker.patch.object(RosettaCSVGenerator, "read_rosetta_schema")
+    csvgen = RosettaCSVGenerator(droid_report, False, False, io.StringIO(""))
+    csvgen.read_sources()
+    csvgen.subseriesmask = "T\\"
+
+    def resolved_path(title, sub_series):
+        droid_row = csvgen.resolve_droid_row("abc", title, sub_series)
+        return droid_row["FILE_PATH"] if droid_row is not None else None
+
+    assert csvgen.droid.duplicates == {"abc"}
+    assert resolved_path("letter", "a") == "T\\a\\letter.doc"
+    assert resolved_path("letter", "b") == "T\\b\\letter.doc"
+    assert resolved_path("memo", "b") == "T\\b\\memo.doc"
+    assert resolved_path("memo", "a") is None
+    assert resolved_path("report", "a") is None
+    assert csvgen.metrics.counters["duplicate resolutions"] == 4
+
+
+def test_droid_index_lookup(tmp_path, mocker):
+    """Ensure list control items are resolved from the checksum index
+    without scanning the DROID rows, and the last matching row wins.
+    """
+
+    droid_report = tmp_path / "droid.csv"
+    write_droid_rows(
+        droid_report,
+        [
+            ("letter.doc", "T\\a\\letter.doc", "abc"),
+            ("letter.docx", "T\\a\\letter.docx", "abc"),
+            ("memo.doc", "T\\b\\memo.doc", "def"),
+        ],
+    )
+    mocker.patch.object(RosettaCSVGenerator, "read_rosetta_schema")
+    csvgen = RosettaCSVGenerator(droid_report, False, False, io.StringIO(""))
+    csvgen.read_sources()
+    csvgen.subseriesmask = "T\\"
+
+    assert [drow["NAME"] for drow in csvgen.droid.droidindex["abc"]] == [
+        "letter.doc",
+        "letter.docx",
+    ]
+    assert [drow["NAME"] for drow in csvgen.droid.titleindex[("abc", "letter")]] == [
+        "letter.doc",
+        "letter.docx",
+    ]
+    # lookups are served by the index alone...
+    csvgen.droid.droidlist = []
+    assert csvgen.resolve_droid_row("abc", "letter", "a")["NAME"] == "letter.docx"
+    assert csvgen.resolve_droid_row("def", "memo", "b")["NAME"] == "memo.doc"
+    assert csvgen.resolve_droid_row("def", "letter", "b") is None
+
+
+def test_select_droid_hash_column(tmp_path, mocker):
+    """Ensure the DROID hash column is chosen from the headers of the
+    exports in the configured order of preference.
+    """
+
+    mocker.patch.object(RosettaCSVGenerator, "read_rosetta_schema")
+    hashes_config = "[application configuration]\ndroidhashes = SHA256_HASH, MD5_HASH\n"
+
+    first = tmp_path / "first.csv"
+    second = tmp_path / "second.csv"
+    empty = tmp_path / "empty.csv"
+    first.write_text(
+        "URI,TYPE,NAME,FILE_PATH,MD5_HASH,SHA256_HASH\n"
+        "file:/a.doc,File,a.doc,a.doc,abc,def\n",
+        encoding="utf-8",
+    )
+    second.write_text("URI,TYPE,NAME,FILE_PATH,SHA256_HASH\n", encoding="utf-8")
+    empty.write_text("", encoding="utf-8")
+    droidcsvs = [str(first), str(empty), str(second)]
+
+    csvgen = RosettaCSVGenerator(droidcsvs, False, False, io.StringIO(hashes_config))
+    csvgen.read_sources()
+    assert csvgen.droid.hashcolumn == "SHA256_HASH"
+    assert csvgen.droid.droidlist[0]["SHA256_HASH"] == "def"
+    assert "MD5_HASH" not in csvgen.droid.droidlist[0]
+
+    second.write_text("URI,TYPE,NAME,FILE_PATH,MD5_HASH\n", encoding="utf-8")
+    csvgen = RosettaCSVGenerator(droidcsvs, False, False, io.StringIO(hashes_config))
+    with pytest.raises(SystemExit):
+        csvgen.read_sources()
+
+
+def test_multiple_droid_csvs(tmp_path):
+    """Ensure DROID CSVs from more than one run are merged into a single
+    index, and files in more than one export are only read once.
+    """
+
+    tmp_dir = tmp_path / "test_merged_ingest"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    list_control_file = tmp_dir / "lc.csv"
+
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(dupe_list_control.strip().lstrip(), encoding="utf-8")
+
+    header, *rows = dupe_droid_csv.strip().lstrip().splitlines()
+    (tmp_dir / "droid-run-1.csv").write_text(
+        "\n".join([header] + rows[:2]), encoding="utf-8"
+    )
+    (tmp_dir / "droid-run-2.csv").write_text(
+        "\n".join([header] + rows[1:]), encoding="utf-8"
+    )
+
+    csvgen = RosettaCSVGenerator(
+        str(tmp_dir / "droid-run-*.csv"),
+        list_control_file,
+        schema_file,
+        config_file,
+        "",
+    )
+    res = csvgen.export_to_rosetta_csv()
+    assert res.strip() == dupe_result.strip()
+    assert len(csvgen.droidcsvs) == 2
+    assert len(csvgen.droid.droidlist) == 2
+    assert csvgen.droid.duplicates == {"294c07b86ad9b460007d1655be2bbf38"}
+
+
+def test_droid_index_cache(tmp_path):
+    """Ensure a cached DROID index is used on repeat runs and gives the
+    same result.
+    """
+
+    tmp_dir = tmp_path / "test_cached_ingest"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+    cache_dir = tmp_dir / "cache"
+
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(dupe_droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(dupe_list_control.strip().lstrip(), encoding="utf-8")
+
+    for cached in (False, True):
+        csvgen = RosettaCSVGenerator(
+            droid_report,
+            list_control_file,
+            schema_file,
+            config_file,
+            "",
+            cachedir=cache_dir,
+        )
+        res = csvgen.export_to_rosetta_csv()
+        assert res.strip() == dupe_result.strip()
+        assert ("droid read and filter" not in csvgen.metrics.timings) is cached
+
+
+def test_droid_index_cache_round_trip(tmp_path):
+    """Ensure the rows, checksum index and duplicates of a DROID index are
+    the same once loaded from the cache, for rows from exports with
+    different columns.
+    """
+
+    droid_report = tmp_path / "droid.csv"
+    write_droid_rows(droid_report, [("letter.doc", "a\\letter.doc", "abc")])
+    columns = {"NAME", "FILE_PATH", "MD5_HASH", "SIZE"}
+    full = DroidRow.column_index(["NAME", "FILE_PATH", "MD5_HASH", "SIZE"])
+    short = DroidRow.column_index(["NAME", "FILE_PATH", "MD5_HASH"])
+    droidlist = [
+        DroidRow(full, ("letter.doc", "a\\letter.doc", "abc", "10")),
+        DroidRow(short, ("letter.doc", "b\\letter.doc", "abc")),
+        DroidRow(full, ("memo.doc", "a\\memo.doc", "def", "20")),
+    ]
+    droid = DroidIndex.merge([str(droid_report)], "MD5_HASH", [droidlist])
+    droid.index_duplicates()
+
+    cache = DroidIndexCache(tmp_path / "cache")
+    cache.save(droid, columns)
+    cached = cache.load([str(droid_report)], columns)
+    assert [dict(row) for row in cached.droidlist] == [dict(row) for row in droidlist]
+    assert {
+        checksum: [dict(row) for row in rows]
+        for checksum, rows in cached.droidindex.items()
+    } == {
+        checksum: [dict(row) for row in rows]
+        for checksum, rows in droid.droidindex.items()
+    }
+    assert cached.duplicates == {"abc"}
+    assert cache.load([str(droid_report)], columns - {"SIZE"}) is None
+
+
+def test_droid_index_cache_fingerprint(tmp_path, mocker):
+    """Ensure a DROID export is only hashed again to check a cache entry
+    when its modification time has changed.
+    """
+
+    droid_report = tmp_path / "droid.csv"
+    write_droid_rows(droid_report, [("letter.doc", "a\\letter.doc", "abc")])
+    cache = DroidIndexCache(tmp_path / "cache")
+    fingerprint = cache.fingerprint(droid_report)
+    content_hash = mocker.spy(cache, "content_hash")
+
+    def touch(seconds):
+        stat = droid_report.stat()
+        mtime_ns = stat.st_mtime_ns + seconds * 1_000_000_000
+        os.utime(droid_report, ns=(stat.st_atime_ns, mtime_ns))
+
+    assert cache.unchanged(droid_report, fingerprint)
+    assert content_hash.call_count == 0
+
+    touch(1)
+    assert cache.unchanged(droid_report, fingerprint)
+    assert content_hash.call_count == 1
+
+    # the same size, but not the same content.
+    write_droid_rows(droid_report, [("letter.doc", "a\\letter.doc", "abd")])
+    touch(2)
+    assert not cache.unchanged(droid_report, fingerprint)
@@ -0,0 +1,164 @@
+"""Fixity verification tests."""
+
+import hashlib
+import io
+import json
+
+import pytest
+
+from src.anz_rosetta_csv.anz_rosetta_csv import main
+from src.anz_rosetta_csv.fixity_verifier_class import (
+    FixityVerifier,
+    hash_algorithm,
+    hash_file,
+    verify_fixity,
+)
+from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+
+from .test_import_generator import config, schema
+
+DROID_HEADER = (
+    "ID,PARENT_ID,URI,FILE_PATH,NAME,METHOD,STATUS,SIZE,TYPE,EXT,LAST_MODIFIED,"
+    "EXTENSION_MISMATCH,MD5_HASH,FORMAT_COUNT,PUID,MIME_TYPE,FORMAT_NAME,FORMAT_VERSION"
+)
+
+
+def md5(data):
+    """Return the MD5 checksum of some bytes."""
+    return hashlib.md5(data).hexdigest()
+
+
+@pytest.fixture(name="files")
+def fixture_files(tmp_path):
+    """Write files that match, don't match, are missing and have no
+    checksum.
+    """
+    verified = tmp_path / "verified.doc"
+    verified.write_bytes(b"verified" * 1000)
+    mismatched = tmp_path / "mismatched.doc"
+    mismatched.write_bytes(b"changed since DROID ran")
+    return [
+        (str(verified), md5(b"verified" * 1000).upper()),
+        (str(mismatched), md5(b"as DROID saw it")),
+        (str(tmp_path / "missing.doc"), md5(b"missing")),
+        (str(verified), ""),
+    ]
+
+
+def test_hash_algorithm():
+    """Ensure DROID hash columns map to hashlib algorithms."""
+    assert hash_algorithm("MD5_HASH") == "md5"
+    assert hash_algorithm("SHA256_HASH") == "sha256"
+    with pytest.raises(ValueError):
+        hash_algorithm("CRC_HASH")
+
+
+def test_hash_file(tmp_path):
+    """Ensure files are hashed whole when read in small chunks."""
+    data = bytes(range(256)) * 10
+    path = tmp_path / "file.bin"
+    path.write_bytes(data)
+    assert hash_file(path, "sha1", chunk_size=100) == (
+        hashlib.sha1(data).hexdigest(),
+        len(data),
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_verify(files, workers):
+    """Ensure each file is reported the same with or without worker
+    processes.
+    """
+    report = FixityVerifier(workers).verify(files, "md5")
+    assert not report.ok
+    assert report.files == 4
+    assert report.counts == {
+        "verified": 1,
+        "mismatched": 1,
+        "missing": 1,
+        "unreadable": 0,
+        "no checksum": 1,
+    }
+    assert report.failures["mismatched"][0]["actual"] == md5(b"changed since DROID ran")
+    assert report.failures["missing"][0]["path"] == files[2][0]
+    output = io.StringIO()
+    report.write_json(output)
+    assert json.loads(output.getvalue())["missing"] == 1
+
+
+def write_transfer(tmp_path):
+    """Write a work copy of a transfer, its DROID export and a config,
+    returning their paths.
+    """
+    root = tmp_path / "work_copy"
+    (root / "Programme").mkdir(parents=True)
+    (root / "Programme" / "letter.doc").write_bytes(b"letter")
+    (root / "Programme" / "memo.doc").write_bytes(b"memo")
+    mask = "R:\\Digitised\\Wellington\\mock_transfer\\"
+    rows = [
+        (2, 0, "Programme", "", "", "Folder"),
+        (3, 2, "Programme\\letter.doc", "letter.doc", md5(b"letter"), "File"),
+        (4, 2, "Programme\\memo.doc", "memo.doc", md5(b"memo, edited"), "File"),
+        (5, 2, "Programme\\minutes.doc", "minutes.doc", md5(b"minutes"), "File"),
+    ]
+    lines = [DROID_HEADER] + [
+        f"{row_id},{parent},file:/{name},{mask}{path},{name},Signature,Done,1,{kind},"
+        f"doc,2017-06-27T13:49:34,false,{checksum},1,fmt/40,,Microsoft Word,"
+        for row_id, parent, path, name, checksum, kind in rows
+    ]
+    droid_report = tmp_path / "droid.csv"
+    droid_report.write_text("\n".join(lines), encoding="utf-8")
+    config_file = tmp_path / "config.cfg"
+    config_file.write_text(config.strip(), encoding="utf-8")
+    return root, droid_report, config_file
+
+
+def test_verify_fixity(tmp_path):
+    """Ensure the files in a DROID export are found under a root by their
+    path with the path mask removed.
+    """
+    root, droid_report, config_file = write_transfer(tmp_path)
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text(schema.strip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(droid_report, False, schema_file, config_file)
+    report = verify_fixity(csvgen, root, workers=1)
+    assert report.files == 3
+    assert report.counts["verified"] == 1
+    assert report.counts["mismatched"] == 1
+    assert report.failures["missing"][0]["path"] == str(
+        root / "Programme" / "minutes.doc"
+    )
+    assert "fixity" in csvgen.metrics.timings
+
+
+def test_verify_without_schema(tmp_path, mocker):
+    """Ensure --verify runs without a Rosetta schema (--ros) and exits 1
+    when a file fails.
+    """
+    root, droid_report, config_file = write_transfer(tmp_path)
+    report_file = tmp_path / "fixity.json"
+
+    mocker.patch(
+        "sys.argv",
+        [
+            "anz_rosetta_csv",
+            "--verify",
+            "--csv",
+            str(droid_report),
+            "--cfg",
+            str(config_file),
+            "--verify-root",
+            str(root),
+            "--verify-workers",
+            "1",
+            "--verify-report",
+            str(report_file),
+        ],
+    )
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 1
+    report = json.loads(report_file.read_text(encoding="utf-8"))
+    assert report["files"] == 3
+    assert report["verified"] == 1
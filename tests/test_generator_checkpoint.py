@@ -0,0 +1,76 @@
+"""Generator checkpoint tests."""
+
+import pytest
+
+from src.anz_rosetta_csv.generator_checkpoint_class import GeneratorCheckpoint
+from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+
+from .test_import_generator import (
+    dupe_config,
+    dupe_droid_csv,
+    dupe_list_control,
+    dupe_result,
+    schema,
+)
+
+
+def test_checkpoint_resume(tmp_path, mocker):
+    """Ensure an interrupted run resumes from its checkpoint and gives
+    the same output as an uninterrupted run.
+    """
+
+    tmp_dir = tmp_path / "test_checkpoint_ingest"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+    checkpoint_dir = tmp_dir / "checkpoint"
+    output_file = tmp_dir / "rosetta.csv"
+
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(dupe_droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(dupe_list_control.strip().lstrip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(
+        droid_report,
+        list_control_file,
+        schema_file,
+        config_file,
+        "",
+        checkpointdir=checkpoint_dir,
+    )
+    # interrupt the run after the first list control item is committed...
+    csv_item_rows = csvgen.csv_item_rows
+    written = []
+
+    def interrupt(itemrow):
+        if written:
+            raise KeyboardInterrupt
+        written.append(itemrow)
+        return csv_item_rows(itemrow)
+
+    mocker.patch.object(csvgen, "csv_item_rows", side_effect=interrupt)
+    checkpoint = GeneratorCheckpoint(
+        checkpoint_dir, output_file, csvgen.checkpoint_inputs(), interval=1
+    )
+    with open(output_file, "w", encoding="utf-8", newline="") as output:
+        with pytest.raises(KeyboardInterrupt):
+            csvgen.export_to_rosetta_csv(output=output, checkpoint=checkpoint)
+        # a partly written item that wasn't committed...
+        output.write('"IE","","partial')
+    assert checkpoint.checkpoint_file.is_file()
+
+    csvgen = RosettaCSVGenerator(
+        droid_report,
+        list_control_file,
+        schema_file,
+        config_file,
+        "",
+        checkpointdir=checkpoint_dir,
+    )
+    csvgen.export_to_rosetta_csv_file(output_file)
+    assert output_file.read_text(encoding="utf-8").strip() == dupe_result.strip()
+    assert csvgen.metrics.counters["droid lookups"] == 2
+    assert not checkpoint.checkpoint_file.is_file()
@@ -2,8 +2,14 @@
 
 # pylint: disable=C0103
 
+import csv
+import io
+import json
 from typing import Final
 
+import pytest
+
+from src.anz_rosetta_csv.anz_rosetta_csv import main
 from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
 
 schema: Final[
@@ -536,6 +542,71 @@ def test_csv_generation(tmp_path):
     assert res.strip() == result.strip()
 
 
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_csv_generation_streamed(tmp_path, pipeline):
+    """Ensure streaming the CSV to a file-like object, pipelined or not,
+    gives the same result as returning it as a string.
+    """
+
+    tmp_dir = tmp_path / "test_streamed_ingest"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+    prov_file = tmp_dir / "prov.notes"
+
+    config_file.write_text(config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(list_control.strip().lstrip(), encoding="utf-8")
+    prov_file.write_text(prov.strip().lstrip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(
+        droid_report,
+        list_control_file,
+        schema_file,
+        config_file,
+        prov_file,
+        pipeline=pipeline,
+    )
+    output = io.StringIO()
+    assert csvgen.export_to_rosetta_csv(output=output) is None
+    assert output.getvalue() == f"{result.strip()}\n"
+
+
+def test_csv_rows_escape_quotes(tmp_path):
+    """Ensure quotes inside values are escaped so that every row reads
+    back with the same values.
+    """
+
+    tmp_dir = tmp_path / "test_csv_rows"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+
+    config_file.write_text(config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(list_control.strip().lstrip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(
+        droid_report, list_control_file, schema_file, config_file, ""
+    )
+    rows = [
+        ["IE", "", csvgen.add_csv_value('The "Rule" Programme\r\n'), "R1"],
+        ["FILE", "", "", "a, b"],
+    ]
+    rendered = csvgen.csv_item_rows(rows)
+    assert rendered == ('"IE","","The ""Rule"" Programme","R1"\n"FILE","","","a, b"\n')
+    assert list(csv.reader(io.StringIO(rendered))) == [
+        ["IE", "", 'The "Rule" Programme', "R1"],
+        ["FILE", "", "", "a, b"],
+    ]
+
+
 dupe_config: Final[
     str
 ] = """
@@ -656,3 +727,151 @@ def test_duplicates(tmp_path):
     )
     res = csvgen.export_to_rosetta_csv()
     assert res.strip() == dupe_result.strip()
+    assert csvgen.metrics.counters == {
+        "droid lookups": 2,
+        "duplicate resolutions": 2,
+        "provenance overrides": 0,
+        "unmatched items": 0,
+        "validation errors": 0,
+    }
+
+
+def test_metrics_json(tmp_path, mocker):
+    """Ensure the metrics for a run are written to --metrics-json with a
+    timing for each phase of the run and its counters.
+    """
+
+    tmp_dir = tmp_path / "test_metrics_ingest"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+    output_file = tmp_dir / "rosetta.csv"
+    metrics_file = tmp_dir / "metrics.json"
+
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(dupe_droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(dupe_list_control.strip().lstrip(), encoding="utf-8")
+
+    mocker.patch(
+        "sys.argv",
+        [
+            "anz_rosetta_csv",
+            "--csv",
+            str(droid_report),
+            "--exp",
+            str(list_control_file),
+            "--ros",
+            str(schema_file),
+            "--cfg",
+            str(config_file),
+            "--out",
+            str(output_file),
+            "--metrics-json",
+            str(metrics_file),
+        ],
+    )
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert not exit_info.value.code
+    assert output_file.read_text(encoding="utf-8").strip() == dupe_result.strip()
+
+    metrics = json.loads(metrics_file.read_text(encoding="utf-8"))
+    assert set(metrics) == {"timings", "counters"}
+    for phase in (
+        "config load",
+        "schema read",
+        "droid read and filter",
+        "droid index",
+        "duplicate detection",
+        "title index",
+        "list control read",
+        "join",
+        "render",
+        "write",
+    ):
+        assert metrics["timings"][phase] >= 0
+    assert metrics["counters"] == {
+        "droid lookups": 2,
+        "duplicate resolutions": 2,
+        "provenance overrides": 0,
+        "unmatched items": 0,
+        "validation errors": 0,
+    }
+
+
+def test_misaligned_config(tmp_path):
+    """Ensure a config that isn't aligned with the schema is rejected
+    before any rows are created.
+    """
+
+    tmp_dir = tmp_path / "test_misaligned_ingest"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+
+    misaligned_config = config.replace(
+        "IE = Title (DC),Access Rights Policy ID (IE),",
+        "IE = Access Rights Policy ID (IE),Title (DC),",
+    )
+    config_file.write_text(misaligned_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(False, False, schema_file, config_file)
+    with pytest.raises(SystemExit):
+        csvgen.prepare_item_rows()
+
+
+def test_duplicates_report(tmp_path):
+    """Ensure duplicate checksums are reported with their DROID paths."""
+
+    tmp_dir = tmp_path / "test_dupe_report"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+    report_file = tmp_dir / "duplicates.json"
+
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(dupe_droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(dupe_list_control.strip().lstrip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(
+        droid_report,
+        list_control_file,
+        schema_file,
+        config_file,
+        "",
+        duplicatesreport=report_file,
+    )
+    csvgen.export_to_rosetta_csv()
+    report = json.loads(report_file.read_text(encoding="utf-8"))
+    assert report == [
+        {
+            "checksum": "294c07b86ad9b460007d1655be2bbf38",
+            "count": 2,
+            "paths": [
+                "R:\\Digitised\\Wellington\\mock_transfer\\2006-2007 Project Programme\\2006-07 Project Programme – MoU invitation to submit.pdf ",
+                "R:\\Digitised\\Wellington\\mock_transfer\\2006-2007 Project Programme\\2006-07 Project Programme Submission to MoU\\2006-07 Rules Bid_ (🥬) Letter.doc ",
+            ],
+        }
+    ]
+
+
+def test_validate_csv_without_schema(tmp_path, mocker, capsys):
+    """Ensure --validate-csv without a Rosetta schema (--ros) is reported
+    as an error in the arguments.
+    """
+
+    csv_file = tmp_path / "rosetta.csv"
+    csv_file.write_text(dupe_result.strip(), encoding="utf-8")
+
+    mocker.patch("sys.argv", ["anz_rosetta_csv", "--validate-csv", str(csv_file)])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert "--validate-csv needs the Rosetta CSV schema" in capsys.readouterr().err
@@ -0,0 +1,72 @@
+"""JSON Table Schema constraint tests."""
+
+import json
+
+import pytest
+
+from src.anz_rosetta_csv.json_table_schema.json_table_schema import (
+    FormatError,
+    JSONTableSchema,
+)
+
+constraint_schema = {
+    "fields": [
+        {
+            "name": "Object Type",
+            "constraints": {
+                "required": True,
+                "pattern": "^(SIP|IE|REPRESENTATION|FILE)$",
+            },
+        },
+        {"name": "Title", "constraints": {"minLength": 2, "maxLength": 5}},
+        {"name": "Identifier", "constraints": {"unique": True, "pattern": ""}},
+        {"name": "Revision", "constraints": {"minimum": 1, "maximum": 10}},
+        {"name": "Description"},
+    ]
+}
+
+
+def test_compiled_constraints(tmp_path):
+    """Ensure constraints are kept by the schema and validate rows."""
+
+    schema = JSONTableSchema(json.dumps(constraint_schema))
+    assert schema.fields[0]["constraints"]["required"] is True
+
+    validator = schema.compile_validators()
+    assert validator.validate_row(["IE", "abc", "R1", "1", ""], 2) == []
+    assert validator.validate_row(["FILE", "", "", "", "anything"], 3) == []
+
+    errors = validator.validate_row(["", "a", "R1", "11", ""], 4)
+    assert [(column, message) for _, column, _, message in errors] == [
+        ("Object Type", "value is required"),
+        ("Title", "shorter than minLength 2"),
+        ("Identifier", "value is not unique"),
+        ("Revision", "greater than maximum 10"),
+    ]
+
+    errors = validator.validate_row(["OTHER", "abcdef", "R2", "one"], 5)
+    assert [(column, message) for _, column, _, message in errors] == [
+        (None, "row has 4 columns, schema has 5"),
+        ("Object Type", "doesn't match pattern '^(SIP|IE|REPRESENTATION|FILE)$'"),
+        ("Title", "longer than maxLength 5"),
+        ("Revision", "less than minimum 1"),
+        ("Revision", "greater than maximum 10"),
+    ]
+
+    csv_file = tmp_path / "rosetta.csv"
+    csv_file.write_text(
+        '"Object Type","Title","Identifier","Revision","Description"\n'
+        '"SIP","ok","R3","2",""\n'
+        '"IE","ok","R3","2",""\n',
+        encoding="utf-8",
+    )
+    errors = list(schema.compile_validators().validate_csv(csv_file))
+    assert errors == [(3, "Identifier", "R3", "value is not unique")]
+
+
+def test_invalid_constraint():
+    """Ensure unknown constraints are rejected."""
+
+    schema = {"fields": [{"name": "Title", "constraints": {"enum": ["a"]}}]}
+    with pytest.raises(FormatError):
+        JSONTableSchema(json.dumps(schema))
@@ -8,9 +8,21 @@ look.
 
 import io
 
+import pytest
+
+from src.anz_rosetta_csv.droid_index_class import droid_title
+from src.anz_rosetta_csv.import_sheet_generator import ImportSheetGenerator
 from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
 
 
+def legacy_normalize_spaces(filename):
+    """Normalize spaces as the generator did before titles were indexed."""
+    if filename.find("  ") != -1:
+        filename = filename.replace("  ", " ")
+        return legacy_normalize_spaces(filename)
+    return filename
+
+
 def test_normalize_spaces(mocker):
     """Test spaces are normalized correctly."""
 
@@ -73,6 +85,50 @@ def test_normalize_spaces(mocker):
     assert rosetta_csv_gen.normalize_spaces(case_onespace) == result_onespace
 
 
+def test_normalize_spaces_matches_legacy(mocker):
+    """Ensure titles are normalized, and so matched, as they were before
+    titles were indexed, including tabs and leading or trailing spaces.
+    """
+    placeholder_config = io.StringIO("")
+    mocker.patch.object(RosettaCSVGenerator, "read_rosetta_schema")
+    rosetta_csv_gen = RosettaCSVGenerator(False, False, False, placeholder_config)
+
+    cases = [
+        "",
+        " ",
+        "     ",
+        "\t",
+        "one\t\ttwo",
+        "one \t  two",
+        "  leading",
+        "trailing   ",
+        " \t both \t ",
+        "one         two",
+        "\u00a0\u00a0non-breaking",
+        "line\n\nbreak",
+    ]
+    for case in cases:
+        assert rosetta_csv_gen.normalize_spaces(case) == legacy_normalize_spaces(case)
+
+    get_title = ImportSheetGenerator().get_title
+    for name, title in [
+        ("FILE  NAME .DOC", "FILE NAME"),
+        ("  leading   spaces.doc", " leading spaces"),
+        ("tab\t  separated.doc", "tab\t separated"),
+        ("tab\tseparated.doc", "tab separated"),
+    ]:
+        legacy_title = legacy_normalize_spaces(get_title(name))
+        legacy = legacy_title == legacy_normalize_spaces(title)
+        indexed_title = rosetta_csv_gen.normalize_spaces(title)
+        assert (droid_title(name) == indexed_title) is legacy
+        with pytest.deprecated_call():
+            assert (
+                rosetta_csv_gen.compare_filenames_as_titles({"NAME": name}, title)
+                is legacy
+            )
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
 def test_compare_filenames_as_titles(mocker):
     """Test that filenames are compared correctly."""
     placeholder_config = io.StringIO("")
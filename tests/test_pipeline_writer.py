@@ -0,0 +1,40 @@
+"""Pipeline writer tests."""
+
+import io
+
+import pytest
+
+from src.anz_rosetta_csv.pipeline_writer_class import PipelineWriter
+
+
+class FailingOutput(io.StringIO):
+    """Output that fails after its first write."""
+
+    def write(self, text):
+        if self.getvalue():
+            raise OSError("no space left on device")
+        return super().write(text)
+
+
+def test_pipeline_writer_order():
+    """Ensure writes and submitted work are done in order."""
+
+    output = io.StringIO()
+    seen = []
+    with PipelineWriter(output, maxsize=2) as writer:
+        for idx in range(100):
+            writer.write(f"{idx}\n")
+            writer.submit(lambda idx=idx: seen.append((idx, output.getvalue())))
+    assert output.getvalue() == "".join(f"{idx}\n" for idx in range(100))
+    assert seen[10] == (10, "".join(f"{idx}\n" for idx in range(11)))
+
+
+def test_pipeline_writer_error():
+    """Ensure an error writing the output is raised in the writing
+    thread.
+    """
+
+    with pytest.raises(OSError, match="no space left"):
+        with PipelineWriter(FailingOutput(), maxsize=2) as writer:
+            for idx in range(1000):
+                writer.write(f"{idx}\n")
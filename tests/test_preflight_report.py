@@ -0,0 +1,72 @@
+"""Pre-flight join report tests."""
+
+from src.anz_rosetta_csv.preflight_report_class import preflight
+from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+
+from .test_import_generator import (
+    config,
+    droid_csv,
+    dupe_config,
+    dupe_droid_csv,
+    dupe_list_control,
+    list_control,
+    schema,
+)
+
+
+def test_preflight(tmp_path):
+    """Ensure a pre-flight run reports list control items that don't
+    match a DROID row, ambiguous duplicates and orphaned DROID rows.
+    """
+
+    tmp_dir = tmp_path / "test_preflight"
+    tmp_dir.mkdir()
+    config_file = tmp_dir / "config.cfg"
+    schema_file = tmp_dir / "schema.json"
+    droid_report = tmp_dir / "droid.csv"
+    list_control_file = tmp_dir / "lc.csv"
+
+    config_file.write_text(config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(
+        list_control.strip()
+        .lstrip()
+        .replace("294c07b86ad9b460007d1655be2bbf38", "00000000000000000000000000000000")
+        .replace("2006-07 Rules Bid_ Letter", "2006-07 Rules Bid_ Memo"),
+        encoding="utf-8",
+    )
+
+    csvgen = RosettaCSVGenerator(
+        droid_report, list_control_file, schema_file, config_file, ""
+    )
+    report = preflight(csvgen)
+    assert not report.ok
+    result_dict = report.as_dict()
+    assert result_dict["unmatched"] == 2
+    assert result_dict["ambiguous duplicates"] == 0
+    assert result_dict["matched"] == result_dict["list control items"] - 2
+    assert result_dict["orphaned droid rows"] == (
+        result_dict["droid rows"] - result_dict["matched"]
+    )
+    assert [sample["reason"] for sample in result_dict["samples"]["unmatched"]] == [
+        "checksum isn't in the DROID export",
+        "title doesn't match a DROID file name",
+    ]
+    assert csvgen.metrics.counters["unmatched items"] == 2
+
+    # a duplicate checksum that can't be resolved via its sub-series.
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(dupe_droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(
+        dupe_list_control.strip()
+        .lstrip()
+        .replace(",Project Programme,", ",Elsewhere,"),
+        encoding="utf-8",
+    )
+    csvgen = RosettaCSVGenerator(
+        droid_report, list_control_file, schema_file, config_file, ""
+    )
+    report = preflight(csvgen)
+    assert report.counts["ambiguous duplicates"] == 1
+    assert report.samples["ambiguous duplicates"][0]["candidates"]
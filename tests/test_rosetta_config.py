@@ -0,0 +1,84 @@
+"""Rosetta config tests."""
+
+import configparser as ConfigParser
+import os
+
+import pytest
+
+from src.anz_rosetta_csv.rosetta_config_class import RosettaConfig
+from src.anz_rosetta_csv.rosetta_csv_sections_class import RosettaCSVSections
+
+CONFIG = """
+[rosetta mapping]
+SIP Title=Accession test ingest
+Title (DC)=Title
+
+[application configuration]
+pipeline=yes
+
+[rosetta csv fields]
+CSVSECTIONS=IE,FILE
+IE=Object Type,Title (DC)
+FILE=Object Type,File Original Name
+"""
+
+
+@pytest.fixture(name="config_file")
+def fixture_config_file(tmp_path):
+    """Write a config to parse."""
+    config_file = tmp_path / "config.cfg"
+    config_file.write_text(CONFIG.strip(), encoding="utf-8")
+    yield config_file
+    RosettaConfig.clear_cache()
+
+
+def test_config_lookups(config_file):
+    """Ensure the config is looked up like a RawConfigParser and can't be
+    changed.
+    """
+    rosetta_config = RosettaConfig.load(config_file)
+    assert rosetta_config.has_section("rosetta mapping")
+    assert not rosetta_config.has_section("droid mapping")
+    assert rosetta_config.has_option("rosetta mapping", "SIP Title")
+    assert rosetta_config.get("rosetta mapping", "sip title") == "Accession test ingest"
+    assert rosetta_config.items("rosetta mapping") == [
+        ("sip title", "Accession test ingest"),
+        ("title (dc)", "Title"),
+    ]
+    assert rosetta_config.getboolean("application configuration", "pipeline")
+    with pytest.raises(ConfigParser.NoOptionError):
+        rosetta_config.get("rosetta mapping", "missing")
+    with pytest.raises(ConfigParser.NoSectionError):
+        rosetta_config.items("droid mapping")
+    with pytest.raises(AttributeError):
+        rosetta_config.configfile = "other.cfg"
+    with pytest.raises(TypeError):
+        rosetta_config.values["rosetta mapping"]["sip title"] = "changed"
+
+
+def test_config_cache(config_file, mocker):
+    """Ensure a config is parsed once and again only when it changes."""
+    parse = mocker.spy(RosettaConfig, "parse")
+    first = RosettaConfig.load(config_file)
+    assert RosettaConfig.load(str(config_file)) is first
+    assert RosettaCSVSections(first).config is first
+    assert parse.call_count == 1
+
+    config_file.write_text(
+        CONFIG.strip().replace("Accession test ingest", "Changed"), encoding="utf-8"
+    )
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = RosettaConfig.load(config_file)
+    assert second is not first
+    assert second.get("rosetta mapping", "SIP Title") == "Changed"
+    assert parse.call_count == 2
+
+
+def test_config_required_sections(config_file, tmp_path):
+    """Ensure missing configs and required sections exit up front."""
+    RosettaConfig.load(config_file, ("rosetta mapping", "rosetta csv fields"))
+    with pytest.raises(SystemExit):
+        RosettaConfig.load(config_file, ("droid mapping",))
+    with pytest.raises(SystemExit):
+        RosettaConfig.load(tmp_path / "missing.cfg")
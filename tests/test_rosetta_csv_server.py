@@ -0,0 +1,131 @@
+"""Rosetta CSV job server tests."""
+
+import http.client
+import json
+import threading
+
+import pytest
+
+from src.anz_rosetta_csv.rosetta_csv_server_class import (
+    RosettaCSVServer,
+    UnixHTTPConnection,
+    parse_address,
+)
+
+from .test_import_generator import config, droid_csv, list_control, prov, result, schema
+
+
+@pytest.fixture(name="job")
+def fixture_job(tmp_path):
+    """Write the inputs of a job."""
+    files = {
+        "configfile": ("config.cfg", config),
+        "rosettaschema": ("schema.json", schema),
+        "droidcsv": ("droid.csv", droid_csv),
+        "exportsheet": ("lc.csv", list_control),
+        "provenance": ("prov.notes", prov),
+    }
+    job = {}
+    for argument, (name, content) in files.items():
+        path = tmp_path / name
+        path.write_text(content.strip(), encoding="utf-8")
+        job[argument] = str(path)
+    return job
+
+
+def start_server(address):
+    """Start a job server in the background."""
+    server = RosettaCSVServer(address, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def request(connection, method, path, body=None):
+    """Make a request and return the status and body of the response."""
+    payload = json.dumps(body) if body is not None else None
+    connection.request(method, path, body=payload)
+    response = connection.getresponse()
+    return response.status, response.read().decode("utf-8")
+
+
+def test_parse_address():
+    """Ensure TCP and Unix socket addresses are understood."""
+    assert parse_address("unix:/tmp/rosetta.sock")[1] == "/tmp/rosetta.sock"
+    assert parse_address("127.0.0.1:8080")[1] == ("127.0.0.1", 8080)
+    assert parse_address("8080")[1] == ("127.0.0.1", 8080)
+
+
+def test_server_jobs(job):
+    """Ensure jobs stream the same Rosetta CSV as the command line, and
+    schemas, sections and DROID indexes are kept warm between jobs.
+    """
+    server = start_server("127.0.0.1:0")
+    try:
+        host, port = server.address
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        for _ in range(2):
+            status, body = request(connection, "POST", "/jobs", job)
+            assert status == 200
+            assert body == f"{result.strip()}\n"
+
+        status, body = request(connection, "GET", "/status")
+        stats = json.loads(body)
+        assert status == 200
+        assert stats["jobs"]["completed"] == 2
+        for cache in ("schemas", "sections", "droid indexes"):
+            assert stats["caches"][cache]["entries"] == 1
+            assert stats["caches"][cache]["hits"] == 1
+
+        status, body = request(connection, "POST", "/jobs", {"droidcsv": "x"})
+        assert status == 400
+        assert "missing job arguments" in json.loads(body)["error"]
+
+        status, body = request(
+            connection,
+            "POST",
+            "/jobs",
+            dict(job, droidcsv=job["droidcsv"] + ".missing"),
+        )
+        assert status == 422
+        connection.close()
+    finally:
+        server.shutdown()
+
+
+def test_server_cancels_queued_job(job):
+    """Ensure a job whose caller goes away while it waits for a worker is
+    cancelled rather than run.
+    """
+    server = RosettaCSVServer("127.0.0.1:0", workers=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection(*server.address, timeout=30)
+        connection.request("POST", "/jobs", body=json.dumps(job))
+        queued = server.jobs.get(timeout=30)
+        connection.close()
+        assert queued.cancelled.wait(30)
+        server.run_job(queued)
+        assert server.stats()["jobs"] == {
+            "running": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 1,
+        }
+    finally:
+        server.shutdown()
+
+
+def test_server_unix_socket(job, tmp_path):
+    """Ensure jobs can be run over a Unix socket."""
+    socket_path = tmp_path / "rosetta.sock"
+    server = start_server(f"unix:{socket_path}")
+    try:
+        connection = UnixHTTPConnection(str(socket_path), timeout=30)
+        status, body = request(connection, "POST", "/jobs", job)
+        assert status == 200
+        assert body == f"{result.strip()}\n"
+        connection.close()
+    finally:
+        server.shutdown()
+    assert not socket_path.exists()
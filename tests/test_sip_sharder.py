@@ -0,0 +1,77 @@
+"""SIP sharder tests."""
+
+from src.anz_rosetta_csv.rosetta_csv_generator import RosettaCSVGenerator
+from src.anz_rosetta_csv.sip_sharder_class import SIPSharder, SIPShardWriter
+
+from .test_import_generator import (
+    dupe_config,
+    dupe_droid_csv,
+    dupe_list_control,
+    dupe_result,
+    schema,
+)
+
+
+def test_pack_in_order():
+    """Ensure shards are filled in list control order without a byte
+    limit.
+    """
+
+    ies = [(idx, 2, 100) for idx in range(7)]
+    assert SIPSharder(max_ies=3).pack(ies) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert SIPSharder(max_files=5).pack(ies) == [[0, 1], [2, 3], [4, 5], [6]]
+    assert SIPSharder(max_ies=3).pack([]) == []
+
+
+def test_pack_by_bytes():
+    """Ensure IEs are packed first-fit decreasing under a byte limit and
+    no limit is exceeded.
+    """
+
+    sizes = [60, 30, 50, 40, 20, 70, 10, 150]
+    ies = [(idx, 1, size) for idx, size in enumerate(sizes)]
+    shards = SIPSharder(max_bytes=100, max_ies=3).pack(ies)
+    # an IE larger than the limit still gets a shard of its own...
+    assert shards == [[7], [1, 5], [0, 3], [2, 4, 6]]
+    for shard in shards:
+        assert shard == sorted(shard)
+        assert len(shard) <= 3
+    assert sorted(ie for shard in shards for ie in shard) == list(range(len(sizes)))
+
+
+def test_sip_shards(tmp_path):
+    """Ensure the Rosetta CSV can be split into SIP shards, each with its
+    own SIP row.
+    """
+
+    config_file = tmp_path / "config.cfg"
+    schema_file = tmp_path / "schema.json"
+    droid_report = tmp_path / "droid.csv"
+    list_control_file = tmp_path / "lc.csv"
+
+    config_file.write_text(dupe_config.strip().lstrip(), encoding="utf-8")
+    schema_file.write_text(schema.strip().lstrip(), encoding="utf-8")
+    droid_report.write_text(dupe_droid_csv.strip().lstrip(), encoding="utf-8")
+    list_control_file.write_text(dupe_list_control.strip().lstrip(), encoding="utf-8")
+
+    csvgen = RosettaCSVGenerator(
+        droid_report,
+        list_control_file,
+        schema_file,
+        config_file,
+        "",
+        sharder=SIPSharder(max_bytes=250000),
+    )
+    shards = SIPShardWriter(csvgen).write(tmp_path / "shards")
+    assert [shard.name for shard in shards] == ["sip-001.csv", "sip-002.csv"]
+
+    header, sip, *rows = dupe_result.strip().splitlines()
+    # the two files are too large to share a SIP...
+    expected = [rows[:3], rows[3:]]
+    for number, (shard, shard_rows) in enumerate(zip(shards, expected), 1):
+        lines = shard.read_text(encoding="utf-8").strip().splitlines()
+        assert lines[0] == header
+        assert lines[1] == sip.replace(
+            '"Duplicates Ingest"', f'"Duplicates Ingest ({number} of 2)"'
+        )
+        assert lines[2:] == shard_rows